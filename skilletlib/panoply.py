@@ -14,29 +14,40 @@
 
 # Authors: Nathan Embery
 
+import asyncio
 import datetime
+import functools
+import itertools
 import logging
 import os
 import random
 import re
 import sys
 import time
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from http.client import RemoteDisconnected
+from io import BytesIO
 from pathlib import Path
+from typing import BinaryIO
+from typing import Match
 from typing import Optional
 from typing import Tuple
+from typing import Union
 from xml.etree import ElementTree
-from xml.etree.ElementTree import ParseError
 
 import requests
 import requests_toolbelt
-import xmltodict
+from requests.adapters import HTTPAdapter
 from lxml import etree
 from lxml.etree import Element
 from pan import xapi
 from pan.config import PanConfig
 from pan.xapi import PanXapiError
 from xmldiff import main as xmldiff_main
+from xmldiff.actions import InsertNode
+from xmldiff.actions import UpdateTextIn
 
 from .exceptions import LoginException
 from .exceptions import PanoplyException
@@ -54,6 +65,330 @@ if not len(logger.handlers):
     handler.setLevel(logging.DEBUG)
     logger.addHandler(handler)
 
+# how long in seconds gathered facts are considered fresh before get_facts will query the device again
+_FACTS_TTL = 60
+
+# baseline skillet directory to use for each PAN-OS version
+_BASELINE_DIRS = {
+    "8.0": "baseline_80",
+    "8.1": "baseline_81",
+    "9.0": "baseline_90",
+    "9.1": "baseline_91",
+    # Support 9.2 Beta and 10.0 for GL #80
+    "9.2": "baseline_91",
+    "10.0": "baseline_91",
+    "10.1": "baseline_91",
+    # catch-all for future 10.x versions
+    "10": "baseline_91",
+}
+
+# loaded baseline skillets keyed by (skillet_type_dir, skillet_dir). These ship with the package and never change
+# at runtime, so they only need to be loaded from disk once per process
+_BASELINE_CACHE = dict()
+
+# matches newlines and any indentation that follows them in xml snippets
+_SANITIZE_RE = re.compile(r"\n\s*")
+
+# matches bare ampersands along with any embedded xml declarations found in some op command output
+_OP_FIX_RE = re.compile(r"&(?!(?:amp|lt|gt|quot|apos);)|<\?xml[^>]*\?>|</xml>")
+
+# captures the api key from the output of 'request license api-key show'
+_LICENSE_KEY_RE = re.compile(r":\s*(\S+)")
+
+# separators between the numeric parts of a dynamic content version such as 8311-6543 or 8.10-1234
+_CONTENT_VERSION_SPLIT_RE = re.compile(r"[.-]")
+
+# patterns used when parsing configuration versions and generated xpaths
+_INVERTED_VERSION_RE = re.compile(r"^-\d+$")
+_POSITIVE_VERSION_RE = re.compile(r"^\d+$")
+_LEADING_DOT_RE = re.compile(r"^\./")
+_ATTRIBUTE_RE = re.compile(r"\[.*\]")
+# split on forward slashes that are not inside quoted attribute values
+_XPATH_SPLIT_RE = re.compile(r'/(?=(?:[^"]*"[^"]*")*[^"]*$)')
+# split off any template, device, or vsys portions of an xpath
+_SPLIT_PATTERN = re.compile(r"/devices/.*?/|vsys/.*?/")
+_CONFIG_PREFIX = re.compile(r"^/config/")
+# positional indexes as found in xpaths generated by xmldiff like entry[1]
+_TRAILING_INDEX = re.compile(r"\[\d+\]$")
+_ANY_INDEX = re.compile(r"\[\d+\]")
+_TRAILING_ONE_INDEX = re.compile(r"\[1\]$")
+
+# little bit of a hack here
+# our set commands can contain slashes like `set mgmt-config ip-address 10.10.10.1/24` and we ultimately
+# need to convert this to xpath format for ordering purposes `set/mgt-confg/ip-address/10.10.10.1/24`
+# so, mark any valid forward slashes with a character that cannot appear in a set command while swapping
+# spaces for slashes, then reverse both in a single pass when converting back
+_SLASH_MARKER = "\x00"
+_SET_CLI_TO_XPATH = str.maketrans({"/": _SLASH_MARKER, " ": "/"})
+_XPATH_TO_SET_CLI = str.maketrans({"/": " ", _SLASH_MARKER: "/"})
+
+# xpaths used to order snippets and set commands, see get_ordered_xpaths
+_ORDERED_XPATHS = (
+    "shared/certificate",
+    "shared/ssl-tls-service-profile",
+    "shared/tag",
+    "shared/profiles",
+    "shared/reports",
+    "shared/",  # catch the rest of the shared items here
+    "tag/",
+    "deviceconfig/system",
+    "network/profiles",
+    "network/interface",
+    "network/virtual-wire",
+    "network/vlan",
+    "network/ike",
+    "network/tunnel",
+    "import/network/interface",  # for use with panorama plugin import (SD-WAN)
+    "network/virtual-router",
+    "network/profiles/zone-protection-profile",
+    "routing-table/ip/static-route/entry/next-hop",  # try to keep next-hop before path-monitor for set cli
+    "routing-table/ip/static-route/entry/path-monitor",  # #70
+    "dynamic-ip-and-port/interface-address",  # GH #70
+    "dynamic-ip-and-port/interface",  # GH #70
+    "dynamic-ip-and-port/ip",  # GH #70
+    "zone/",
+    "profiles/custom-url-category",  # should come before profiles/url-filtering
+    "address/",  # should come before rules or address-group
+)
+
+# xpaths of snippets and set commands that must come after all others
+_POST_XPATHS = ("rulebase",)
+
+# xpaths that will change on the device but are not user configurable
+_IGNORED_XPATHS = (
+    '/config/mgt-config/users/entry[@name="admin"]',
+    "/config/shared/content-preview",
+    "/config/readonly",
+)
+
+# ignore any set clis that start with this commands
+_IGNORED_SET_CLI_PREFIXES = (
+    "set mgt-config users admin phash",
+    "set shared content-preview",
+    "set read-only",
+    "set readonly",
+)
+
+# ignore any set cli that match these commands
+_IGNORED_SET_CLI = frozenset(
+    (
+        "set shared application",
+        "set shared application-group",
+        "set shared service",
+        "set shared service-group",
+    )
+)
+
+# ignore any set cli that contain these strings
+_IGNORED_SET_CLI_PARTS = (
+    "deviceconfig setting management initcfg",
+    "deviceconfig setting management disable-predefined-reports",
+)
+
+# precompiled xpath expressions used on the device ready paths
+_RUNNING_JOBS_XPATH = etree.XPath(".//jobs/status[text() != 'FIN']")
+
+# precompiled xpath expressions used when gathering facts from the deviceconfig/system stanza
+_TIMEZONE_XPATH = etree.XPath("./timezone/text()")
+_DNS_PRIMARY_XPATH = etree.XPath("./dns-setting/servers/primary/text()")
+_DNS_SECONDARY_XPATH = etree.XPath("./dns-setting/servers/secondary/text()")
+_PANORAMA_SERVER_XPATH = etree.XPath("./panorama/local-panorama/panorama-server/text()")
+
+
+def _retry(fn, attempts=3, base=0.5):
+    """
+    Call fn and retry with exponential backoff on transient xapi errors. Authentication errors are raised right away
+
+    :param fn: callable to invoke
+    :param attempts: maximum number of attempts before the last error is raised
+    :param base: initial backoff in seconds, this doubles after every failed attempt
+    :return: the return value of fn
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+
+        except PanXapiError as pxe:
+            if "403" in str(pxe) or attempt == attempts - 1:
+                raise
+
+            logger.debug(f"Retrying after xapi error: {pxe}")
+            time.sleep(base * 2 ** attempt + random.random() * 0.1)
+
+
+def _tree_fingerprint(element: Element) -> tuple:
+    """
+    Build a hashable representation of an element and all of its children. Two elements with the same fingerprint
+    have the same tags, attributes (ignoring uuid), text, and child ordering
+
+    :param element: Element to fingerprint
+    :return: nested tuple representing the element
+    """
+    return (
+        element.tag,
+        tuple(sorted((k, v) for k, v in element.attrib.items() if k != "uuid")),
+        element.text,
+        tuple(_tree_fingerprint(child) for child in element),
+    )
+
+
+def _element_to_dict(element) -> Union[dict, str, None]:
+    """
+    Convert an element into the same dict structure produced by xmltodict. Attributes are prefixed with '@',
+    repeated child tags are collected into a list, and leaf elements without text become None
+
+    :param element: Element to convert
+    :return: dict, text, or None for empty leaf elements
+    """
+    text = element.text.strip() if element.text else None
+
+    if len(element) == 0 and not element.attrib:
+        return text or None
+
+    converted = {f"@{k}": v for k, v in element.attrib.items()}
+
+    for child in element:
+        value = _element_to_dict(child)
+
+        if child.tag not in converted:
+            converted[child.tag] = value
+
+        elif isinstance(converted[child.tag], list):
+            converted[child.tag].append(value)
+
+        else:
+            converted[child.tag] = [converted[child.tag], value]
+
+    if text:
+        converted["#text"] = text
+
+    return converted
+
+
+def _compute_leaf_xpaths(snippets: list) -> list:
+    """
+    Find the leaf xpath of each snippet by using only the xpath portions of the full_xpath after any template,
+    device, or vsys entries
+
+    :param snippets: list of snippets
+    :return: list of tuples of leaf xpath and the position of the snippet in snippets, sorted by leaf xpath
+    """
+    leaf_xpaths = list()
+
+    for position, s in enumerate(snippets):
+        leaf_xpath_initial = _SPLIT_PATTERN.split(s.get("full_xpath", ""))[-1]
+        # handle cases like ./mgt-config/password-complexity - remove the leading './'
+        leaf_xpaths.append((_LEADING_DOT_RE.sub("", leaf_xpath_initial), position))
+
+    return sorted(leaf_xpaths)
+
+
+def _parse_changed_elements(config: str, changed_xpaths: set) -> Element:
+    """
+    Stream parse the config keeping only the elements needed to resolve the given changed xpaths. Elements that are
+    neither an ancestor nor a descendant of a changed xpath are cleared as soon as they are parsed. Cleared elements
+    are left in place so positional indexes in the xpaths remain valid. uuid attributes are removed from all kept
+    elements as they cannot be applied to another device
+
+    :param config: XML configuration string
+    :param changed_xpaths: set of absolute xpaths of changed elements, i.e. /config/shared/log-settings[1]/http
+    :return: root Element of the partially materialized configuration
+    """
+    # compare xpaths without positional indexes, this keeps all siblings sharing a tag along a changed xpath
+    targets = {_ANY_INDEX.sub("", _CONFIG_PREFIX.sub("./", xpath, count=1)) for xpath in changed_xpaths}
+    ancestors = set()
+
+    for target in targets:
+        parts = target.split("/")
+        ancestors.update("/".join(parts[:i]) for i in range(1, len(parts)))
+
+    # track the xpath of each open element and whether it is inside a changed element
+    stack = []
+    root = None
+    data = config.encode("utf-8") if isinstance(config, str) else config
+
+    for event, el in ElementTree.iterparse(BytesIO(data), events=("start", "end")):
+
+        if event == "start":
+
+            if root is None:
+                root = el
+                stack.append((".", False))
+
+            else:
+                parent_path, parent_inside = stack[-1]
+                path = f"{parent_path}/{el.tag}"
+                stack.append((path, parent_inside or path in targets))
+
+            continue
+
+        path, inside = stack.pop()
+
+        if inside or path in ancestors:
+            el.attrib.pop("uuid", None)
+
+        else:
+            el.clear()
+
+    return root
+
+
+def _build_xpath_index(document: Element) -> dict:
+    """
+    Walk the document once and index each element by its relative xpath. Xpaths follow the same convention as the
+    xpaths returned by xmldiff, where an index is only included when siblings share the same tag name,
+    i.e. ./devices/entry/vsys/entry/rulebase/security/rules/entry[2]
+
+    :param document: Element to index
+    :return: dict of relative xpath to Element
+    """
+    index = dict()
+    stack = [(".", document)]
+
+    while stack:
+        path, element = stack.pop()
+        tag_counts = Counter(child.tag for child in element)
+        positions = Counter()
+
+        for child in element:
+
+            if tag_counts[child.tag] > 1:
+                positions[child.tag] += 1
+                child_path = f"{path}/{child.tag}[{positions[child.tag]}]"
+
+            else:
+                child_path = f"{path}/{child.tag}"
+
+            index[child_path] = child
+            stack.append((child_path, child))
+
+    return index
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_ignored_set_cli(set_cli: str) -> bool:
+    """
+    Determines if the generated set cli can be used to recreate this configuration. Some generated
+    set clis are simply remnants of the XML structure and are not actually valid set cli commands
+
+    :param set_cli: set command to check
+    :return: bool True if this cli should be excluded
+    """
+
+    if set_cli.startswith(_IGNORED_SET_CLI_PREFIXES):
+        logger.debug(f"Skipping ignore set cli prefix: {set_cli}")
+        return True
+
+    if set_cli in _IGNORED_SET_CLI:
+        logger.debug(f"Skipping ignore set cli: {set_cli}")
+        return True
+
+    if any(part in set_cli for part in _IGNORED_SET_CLI_PARTS):
+        logger.debug(f"Skipping ignored set cli with part: {set_cli}")
+        return True
+
+    return False
+
 
 class Panoply:
     """
@@ -98,10 +433,23 @@ class Panoply:
         self.connected = False
         self.connected_message = "no connection attempted"
         self.facts = {}
+        self._facts_ts = 0
         self.last_error = ""
         self.offline_mode = False
         self.xapi = None
 
+        # sequential suffix used to build unique snippet names during skillet generation
+        self._snippet_counter = itertools.count()
+
+        # rendered baseline configs keyed on (sw-version, model) used by generate_skillet
+        self._baseline_cache = dict()
+
+        # keep a single http session around so connections to the device can be re-used across api calls
+        self._http = requests.Session()
+        self._http.verify = False
+        self._http.headers.update({"User-Agent": "skilletlib"})
+        self._http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
         if debug:
             logger.setLevel(logging.DEBUG)
 
@@ -162,7 +510,12 @@ class Panoply:
                     serial=self.serial_number,
                 )
 
-            self.key = self.xapi.keygen()
+            # only retry the keygen on an explicit connect, readiness polls handle their own retries
+            if allow_offline:
+                self.key = self.xapi.keygen()
+            else:
+                self.key = _retry(self.xapi.keygen)
+
             self.facts = self.get_facts()
 
         except PanXapiError as pxe:
@@ -185,6 +538,14 @@ class Panoply:
         else:
             self.connected = True
 
+    def close(self) -> None:
+        """
+        Close any open http connections to this device
+
+        :return: None
+        """
+        self._http.close()
+
     def commit(self, force_sync=True) -> str:
         """
         Perform a commit operation on this device instance -
@@ -196,9 +557,7 @@ class Panoply:
 
         try:
             self.xapi.commit(cmd="<commit></commit>", sync=force_sync, timeout=600)
-            results = self.xapi.xml_result()
-
-            if not self.__check_commit_return(results, force_sync):
+            if not self.__check_commit_return(self.xapi.element_result, force_sync):
                 raise PanoplyException(self.xapi.status_detail)
 
             return self.xapi.status_detail
@@ -221,18 +580,9 @@ class Panoply:
             running_config = self.get_configuration(config_source="running")
             config_doc = etree.fromstring(running_config)
 
-            sc = config_doc.xpath(
-                "/config/devices/entry[@name='localhost.localdomain']/"
-                "device-group/entry[@name='Service_Conn_Device_Group']"
-            )
-            rn = config_doc.xpath(
-                "/config/devices/entry[@name='localhost.localdomain']/"
-                "device-group/entry[@name='Remote_Network_Device_Group']"
-            )
-            mu = config_doc.xpath(
-                "/config/devices/entry[@name='localhost.localdomain']/"
-                "device-group/entry[@name='Mobile_User_Device_Groupp']"
-            )
+            sc = self.__has_device_group(config_doc, "Service_Conn_Device_Group")
+            rn = self.__has_device_group(config_doc, "Remote_Network_Device_Group")
+            mu = self.__has_device_group(config_doc, "Mobile_User_Device_Group")
 
             if sc:
                 self.xapi.commit(
@@ -242,9 +592,7 @@ class Panoply:
                     "</device-group></shared-policy></commit-all>",
                 )
 
-                results = self.xapi.xml_result()
-
-                if not self.__check_commit_return(results, force_sync):
+                if not self.__check_commit_return(self.xapi.element_result, force_sync):
                     raise PanoplyException(self.xapi.status_detail)
 
             if rn:
@@ -255,9 +603,7 @@ class Panoply:
                     "</device-group></shared-policy></commit-all>",
                 )
 
-                results = self.xapi.xml_result()
-
-                if not self.__check_commit_return(results, force_sync):
+                if not self.__check_commit_return(self.xapi.element_result, force_sync):
                     raise PanoplyException(self.xapi.status_detail)
 
             if mu:
@@ -268,9 +614,7 @@ class Panoply:
                     "</device-group></shared-policy></commit-all>",
                 )
 
-                results = self.xapi.xml_result()
-
-                if not self.__check_commit_return(results, force_sync):
+                if not self.__check_commit_return(self.xapi.element_result, force_sync):
                     raise PanoplyException(self.xapi.status_detail)
 
             return "Prisma Access Committed Successfully"
@@ -280,41 +624,58 @@ class Panoply:
             raise PanoplyException("Could not commit configuration")
 
     @staticmethod
-    def __check_commit_return(results: str, force_sync: bool) -> bool:
+    def __has_device_group(config_doc: Element, dg_name: str) -> bool:
         """
-        Check xml result from a panos device and check for a failure condition
+        Determine if the named device-group exists in the given panorama configuration. This walks directly down the
+        known path instead of searching the entire configuration document
 
-        :param results: str returned from xapi.xml_result
-        :param force_sync: if force_sync is true, then verify the commit actually succeeded
-        :return: boolean
+        :param config_doc: root 'config' Element of the panorama configuration
+        :param dg_name: name of the device-group to find
+        :return: bool True if the device-group is present
         """
+        devices = config_doc.find("devices")
 
-        if results is None:
+        if devices is None:
             return False
 
-        if force_sync:
-            embedded_result = None
-            try:
-                doc = ElementTree.XML(results)
-                embedded_result = doc.find("result")
+        entry = devices.find("entry[@name='localhost.localdomain']")
 
-            except ParseError:
-                # results can be malformed xml from gpcs
-                if "jobid" in results:
-                    return True
+        if entry is None:
+            return False
 
-            if embedded_result is not None:
-                commit_result = embedded_result.text
+        device_groups = entry.find("device-group")
 
-                if commit_result == "FAIL":
-                    return False
+        if device_groups is None:
+            return False
 
-                else:
-                    return True
-        else:
+        return device_groups.find(f"entry[@name='{dg_name}']") is not None
+
+    @staticmethod
+    def __check_commit_return(element: Optional[ElementTree.Element], force_sync: bool) -> bool:
+        """
+        Check the parsed result from a panos device and check for a failure condition
+
+        :param element: 'result' Element already parsed by the xapi, i.e. xapi.element_result
+        :param force_sync: if force_sync is true, then verify the commit actually succeeded
+        :return: boolean
+        """
+
+        if element is None:
+            return False
+
+        if not force_sync:
             # fixme - is there something else we can check here?
             return True
 
+        # the job details are wrapped in the result element, i.e. <result><job>...<result>OK</result></job></result>
+        embedded_result = element.find("./*/result")
+
+        if embedded_result is None:
+            # results from gpcs only contain a message with the enqueued jobid
+            return "jobid" in "".join(element.itertext())
+
+        return embedded_result.text != "FAIL"
+
     def set_at_path(self, name: str, xpath: str, xml_str: str) -> None:
         """
         Insert XML into the configuration tree at the specified xpath
@@ -360,12 +721,12 @@ class Panoply:
 
                 # show config audit version will return an embedded xml document which breaks everything
                 # just remove the invalid embedded xml tags if present
-                cx = x.replace("&", "&amp;").replace('<?xml version="1.0"?>', "").replace("</xml>", "")
+                cx = _OP_FIX_RE.sub(self.__op_fix_replacement, x)
 
                 try:
                     # make sure our little 'fix' didn't completely ruin the xml structure and return what we got
-                    s = ElementTree.fromstring(cx)
-                    return ElementTree.tostring(s).decode(encoding="UTF-8")
+                    s = etree.fromstring(cx.encode())
+                    return etree.tostring(s, encoding="unicode")
 
                 except Exception as e:
                     logger.error(e)
@@ -373,6 +734,17 @@ class Panoply:
 
             raise PanoplyException(pxe)
 
+    @staticmethod
+    def __op_fix_replacement(match: Match) -> str:
+        """
+        Replacement function used with _OP_FIX_RE. Bare ampersands are escaped and embedded xml declarations
+        are removed
+
+        :param match: regex match object
+        :return: replacement str
+        """
+        return "&amp;" if match.group(0) == "&" else ""
+
     def execute_cli(self, cmd_str: str) -> str:
         """
         Short-cut to execute a simple CLI op cmd
@@ -531,7 +903,8 @@ class Panoply:
                 verify_cmd = "<request><license><api-key><show></show></api-key></license></request>"
                 verify_results = self.execute_op(verify_cmd)
                 logger.debug(verify_results)
-                current_api_key = verify_results.split(": ")[1]
+                key_match = _LICENSE_KEY_RE.search(verify_results)
+                current_api_key = key_match.group(1) if key_match else ""
 
                 if current_api_key == api_key:
                     logger.debug("API Key is already set")
@@ -620,10 +993,7 @@ class Panoply:
         :param element: element str
         :return: sanitized element str
         """
-        element = re.sub(r"\n\s+", "", element)
-        element = re.sub(r"\n", "", element)
-
-        return element
+        return _SANITIZE_RE.sub("", element)
 
     def backup_config(self):
         """
@@ -646,13 +1016,18 @@ class Panoply:
         except xapi.PanXapiError as pxe:
             raise PanoplyException(f"Could not perform backup: {pxe}")
 
-    def get_facts(self) -> dict:
+    def get_facts(self, refresh=False) -> dict:
         """
         Gather system info and keep on self.facts
-        This gets called on every connect
+        This gets called on every connect. Facts gathered within the last _FACTS_TTL seconds are returned
+        without querying the device again
 
+        :param refresh: always query the device, even if the cached facts are still fresh
         :return: dict containing all system facts
         """
+        if not refresh and self.facts and time.monotonic() - self._facts_ts < _FACTS_TTL:
+            return self.facts
+
         facts = {}
 
         # FIXME - add better error handling here
@@ -662,32 +1037,41 @@ class Panoply:
             raise PanoplyException("Could not get facts from device!")
 
         results_xml_str = self.xapi.xml_result()
-        results = xmltodict.parse(results_xml_str)
 
-        if "system" in results:
-            facts.update(results["system"])
+        # stream the results and only build the 'system' element, only simple text values are kept as facts
+        for _, system_info in etree.iterparse(BytesIO(results_xml_str.encode()), tag="system"):
+            facts.update({child.tag: child.text for child in system_info if len(child) == 0})
+            system_info.clear()
 
         self.xapi.show(xpath="./devices/entry[@name='localhost.localdomain']/deviceconfig/system")
         results_xml_str = self.xapi.xml_result()
-        results = xmltodict.parse(results_xml_str)
+        system_config = etree.fromstring(results_xml_str.encode())
+
+        if system_config.tag == "system":
+            timezone = _TIMEZONE_XPATH(system_config)
+            facts["timezone"] = timezone[0] if timezone else "US/Pacific"
 
-        if "system" in results:
-            facts["timezone"] = results["system"].get("timezone", "US/Pacific")
+        else:
+            # use an empty element here so the lookups below fall back to their default values
+            system_config = etree.Element("system")
 
         try:
-            facts["dns-primary"] = results["system"]["dns-setting"]["servers"]["primary"]
-            facts["dns-secondary"] = results["system"]["dns-setting"]["servers"]["secondary"]
+            facts["dns-primary"] = _DNS_PRIMARY_XPATH(system_config)[0]
+            facts["dns-secondary"] = _DNS_SECONDARY_XPATH(system_config)[0]
 
-        except KeyError:
+        except IndexError:
             # DNS is not configured on the host, but we will need it later for some noob operations
             facts["dns-primary"] = "1.1.1.1"
             facts["dns-secondary"] = "1.0.0.1"
 
         try:
-            facts["panorama-server"] = results["system"]["panorama"]["local-panorama"]["panorama-server"]
-        except (KeyError, TypeError):
+            facts["panorama-server"] = _PANORAMA_SERVER_XPATH(system_config)[0]
+        except IndexError:
             facts["panorama-server"] = None
 
+        self.facts = facts
+        self._facts_ts = time.monotonic()
+
         return facts
 
     def get_extended_facts(self) -> dict:
@@ -748,13 +1132,18 @@ class Panoply:
         :return: dict with two keys 'ifnet' and 'hw'.
         """
 
-        interfaces_xml = self.execute_op("<show><interface>all</interface></show>", parse_result=False)
+        self.execute_op("<show><interface>all</interface></show>", parse_result=False)
 
         if self.xapi.status != "success":
             raise PanoplyException("Could not get interfaces!")
 
-        interfaces_result = xmltodict.parse(interfaces_xml)
-        return interfaces_result.get("response", {}).get("result", {})
+        # the response has already been parsed by the xapi, convert the result element directly
+        result_element = self.xapi.element_result
+
+        if result_element is None:
+            return {}
+
+        return _element_to_dict(result_element) or {}
 
     def get_zones(self) -> list:
         """
@@ -858,71 +1247,62 @@ class Panoply:
                 context["MGMT_MASK"] = self.facts["netmask"]
                 context["MGMT_DG"] = self.facts["default-gateway"]
 
-        if "8.0" in version:
-            # load the 8.0 baseline with
-            skillet_dir = "baseline_80"
-
-        elif "8.1" in version:
-            # load the 8.1 baseline with
-            skillet_dir = "baseline_81"
-
-        elif "9.0" in version:
-            # load the 9.0 baseline with
-            skillet_dir = "baseline_90"
-
-        elif "9.1" in version:
-            # load the 9.1 baseline with
-            skillet_dir = "baseline_91"
-
-        # Support 9.2 Beta and 10.0 for GL #80
-        elif "9.2" in version:
-            # load the 9.1 baseline with
-            skillet_dir = "baseline_91"
+        # look up the baseline by major.minor version first, then fall back to the major version only
+        version_parts = version.split(".")
+        skillet_dir = _BASELINE_DIRS.get(".".join(version_parts[:2]), _BASELINE_DIRS.get(version_parts[0]))
 
-        elif "10.0" in version:
-            # load the 9.1 baseline with
-            skillet_dir = "baseline_91"
+        if skillet_dir is None:
+            raise PanoplyException("Could not determine sw-version for baseline load")
 
-        elif "10.1" in version:
-            # load the 9.1 baseline with
-            skillet_dir = "baseline_91"
+        baseline_key = (skillet_type_dir, skillet_dir)
+        baseline_skillet = _BASELINE_CACHE.get(baseline_key, None)
 
-        # catch-all for future 10.x versions
-        elif "10" in version:
-            skillet_dir = "baseline_91"
+        if baseline_skillet is None:
+            template_path = Path(__file__).parent.joinpath("assets", skillet_type_dir, skillet_dir)
+            sl = SkilletLoader()
+            baseline_skillet = sl.load_skillet_from_path(str(template_path.resolve()))
+            _BASELINE_CACHE[baseline_key] = baseline_skillet
 
-        else:
-            raise PanoplyException("Could not determine sw-version for baseline load")
-
-        template_path = Path(__file__).parent.joinpath("assets", skillet_type_dir, skillet_dir)
-        sl = SkilletLoader()
-        baseline_skillet = sl.load_skillet_from_path(str(template_path.resolve()))
         output = baseline_skillet.execute(context)
         if baseline_skillet.success:
             return output["template"]
         else:
             raise PanoplyException("Could not generate baseline config!")
 
-    def import_file(self, filename: str, file_contents: (str, bytes), category: str) -> bool:
+    def import_file(self, filename: str, file_contents: Union[str, bytes, BinaryIO, Path], category: str) -> bool:
         """
-        Import the given file into this device
+        Import the given file into this device. Large files should be passed in as a Path or an open binary file
+        object so they are streamed to the device instead of being buffered in memory
 
-        :param filename:
-        :param file_contents:
+        :param filename: name of the file to create on the device
+        :param file_contents: contents of the file as str or bytes, an open binary file object, or a Path to a local
+        file
         :param category: 'configuration'
         :return: bool True on success
         """
         params = {"type": "import", "category": category, "key": self.key}
 
-        mef = requests_toolbelt.MultipartEncoder(fields={"file": (filename, file_contents, "application/octet-stream")})
+        fh = None
 
-        r = requests.post(
-            f"https://{self.hostname}:{self.port}/api/",
-            verify=False,
-            params=params,
-            headers={"Content-Type": mef.content_type},
-            data=mef,
-        )
+        if isinstance(file_contents, Path):
+            fh = file_contents.open("rb")
+            file_contents = fh
+
+        try:
+            mef = requests_toolbelt.MultipartEncoder(
+                fields={"file": (filename, file_contents, "application/octet-stream")}
+            )
+
+            r = self._http.post(
+                f"https://{self.hostname}:{self.port}/api/",
+                params=params,
+                headers={"Content-Type": mef.content_type},
+                data=mef,
+            )
+
+        finally:
+            if fh is not None:
+                fh.close()
 
         # if something goes wrong just raise an exception
         r.raise_for_status()
@@ -963,7 +1343,7 @@ class Panoply:
         jobs = self.xapi.xml_document
         jobs_element = etree.fromstring(jobs)
 
-        running_jobs_list = jobs_element.xpath(".//jobs/status[text() != 'FIN']")
+        running_jobs_list = _RUNNING_JOBS_XPATH(jobs_element)
 
         return True if running_jobs_list else False
 
@@ -971,54 +1351,132 @@ class Panoply:
         """
         Loop and wait until device is ready or times out
 
-        :param interval: how often to check in seconds
+        :param interval: maximum time to wait between checks in seconds
         :param timeout: how long to wait until we declare a timeout condition
         :return: boolean true on ready, false on timeout
         """
         mark = time.time()
         timeout_mark = mark + timeout
+        # start polling quickly and back off up to the given interval
+        backoff = min(1.0, interval)
 
         while True:
             try:
 
-                self.connect(allow_offline=True)
-                if self.connected:
-
-                    # fix for #60 - show chassis ready is not available on panorama
-                    if self.facts.get("model", "Panorama") == "Panorama":
-                        cmd = "<show><system><info></info></system></show>"
-                        is_panorama = True
-                    else:
-                        cmd = "<show><chassis-ready></chassis-ready></show>"
-                        is_panorama = False
-
-                    self.xapi.op(cmd=cmd)
-                    resp = self.xapi.xml_result()
-
-                    if self.xapi.status == "success":
-                        # in the case of panorama, we may be up but the auto-commit job may still be running
-                        # continue to wait until there are no more jobs
-                        # FIXME - should probably enhance this to only check for auto-commit job, it's possible there
-                        # can be other jobs running with a busy / heavily used panorama instance
-                        if is_panorama:
-                            if not self.has_running_jobs():
-                                return True
-
-                        if resp.strip() == "yes":
-                            return True
+                if self.__check_device_ready():
+                    return True
 
             except TargetLoginException:
                 logger.error("Could not log in to device...")
                 return False
 
-            except PanXapiError:
-                logger.info(f"{self.hostname} is not yet ready...")
+            if time.time() > timeout_mark:
+                return False
+
+            logger.info(f"Waiting for {self.hostname} to become ready...")
+            time.sleep(backoff + random.uniform(0, backoff * 0.25))
+            backoff = min(backoff * 2, interval)
+
+    async def wait_for_device_ready_async(self, interval=30, timeout=600) -> bool:
+        """
+        Coroutine version of 'wait_for_device_ready'. The blocking API calls are run in the default executor so
+        many devices can be waited on from a single event loop
+
+        :param interval: maximum time to wait between checks in seconds
+        :param timeout: how long to wait until we declare a timeout condition
+        :return: boolean true on ready, false on timeout
+        """
+        loop = asyncio.get_event_loop()
+        mark = time.time()
+        timeout_mark = mark + timeout
+        # start polling quickly and back off up to the given interval
+        backoff = min(1.0, interval)
+
+        while True:
+            try:
+
+                if await loop.run_in_executor(None, self.__check_device_ready):
+                    return True
+
+            except TargetLoginException:
+                logger.error("Could not log in to device...")
+                return False
 
             if time.time() > timeout_mark:
                 return False
 
             logger.info(f"Waiting for {self.hostname} to become ready...")
-            time.sleep(interval)
+            await asyncio.sleep(backoff + random.uniform(0, backoff * 0.25))
+            backoff = min(backoff * 2, interval)
+
+    @staticmethod
+    async def wait_for_devices_ready(devices: list, interval=30, timeout=600) -> list:
+        """
+        Wait for all the given devices to become ready concurrently
+
+        :param devices: list of Panoply objects to wait on
+        :param interval: maximum time to wait between checks of each device in seconds
+        :param timeout: how long to wait on each device until we declare a timeout condition
+        :return: list of booleans in the same order as devices, true on ready, false on timeout
+        """
+        return await asyncio.gather(*[d.wait_for_device_ready_async(interval, timeout) for d in devices])
+
+    @classmethod
+    def wait_for_many(cls, devices: list, interval=30, timeout=600) -> list:
+        """
+        Wait for all the given devices to become ready using a pool of threads. This is the synchronous
+        counterpart of wait_for_devices_ready, total wait time is that of the slowest device
+
+        :param devices: list of Panoply objects to wait on
+        :param interval: maximum time to wait between checks of each device in seconds
+        :param timeout: how long to wait on each device until we declare a timeout condition
+        :return: list of booleans in the same order as devices, true on ready, false on timeout
+        """
+        if not devices:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(32, len(devices))) as executor:
+            return list(executor.map(lambda d: d.wait_for_device_ready(interval, timeout), devices))
+
+    def __check_device_ready(self) -> bool:
+        """
+        Perform a single check to determine if this device is ready
+
+        :raises TargetLoginException: if we cannot log in to the device
+        :return: boolean true if the device is ready
+        """
+        try:
+
+            self.connect(allow_offline=True)
+            if self.connected:
+
+                # fix for #60 - show chassis ready is not available on panorama
+                if self.facts.get("model", "Panorama") == "Panorama":
+                    cmd = "<show><system><info></info></system></show>"
+                    is_panorama = True
+                else:
+                    cmd = "<show><chassis-ready></chassis-ready></show>"
+                    is_panorama = False
+
+                self.xapi.op(cmd=cmd)
+                resp = self.xapi.xml_result()
+
+                if self.xapi.status == "success":
+                    # in the case of panorama, we may be up but the auto-commit job may still be running
+                    # continue to wait until there are no more jobs
+                    # FIXME - should probably enhance this to only check for auto-commit job, it's possible there
+                    # can be other jobs running with a busy / heavily used panorama instance
+                    if is_panorama:
+                        if not self.has_running_jobs():
+                            return True
+
+                    if resp.strip() == "yes":
+                        return True
+
+        except PanXapiError:
+            logger.info(f"{self.hostname} is not yet ready...")
+
+        return False
 
     def filter_connected_devices(self, filter_terms=None) -> list:
         """
@@ -1039,39 +1497,36 @@ class Panoply:
             return list()
 
         connected_devices_xml = self.execute_cli("show devices connected")
-        connected_devices_dict = xmltodict.parse(connected_devices_xml)
 
-        if (
-            "devices" in connected_devices_xml
-            and connected_devices_dict["devices"] is not None
-            and "entry" in connected_devices_dict["devices"]
-        ):
-            connected_devices = connected_devices_dict["devices"]["entry"]
-
-        else:
+        if not connected_devices_xml or "devices" not in connected_devices_xml:
             return list()
 
-        if not filter_terms:
-            # no terms given, return all devices
-            return connected_devices
-
-        filtered_devices = list()
+        root = etree.fromstring(connected_devices_xml.encode())
+        entries = root.iterfind("entry") if root.tag == "devices" else root.iterfind(".//devices/entry")
 
-        for device in connected_devices:
-            match = False
+        # each device is represented by its attributes (prefixed with '@') and its simple text values
+        connected_devices = list()
 
-            for term in filter_terms:
-                if term in device:
+        for entry in entries:
+            device = {f"@{k}": v for k, v in entry.attrib.items()}
+            device.update({child.tag: child.text for child in entry if len(child) == 0})
+            connected_devices.append(device)
 
-                    if re.match(filter_terms[term], device[term]):
-                        match = True
-                    else:
-                        match = False
+        if not filter_terms:
+            # no terms given, return all devices
+            return connected_devices
 
-            if match:
-                filtered_devices.append(device)
+        compiled_terms = {term: re.compile(pattern) for term, pattern in filter_terms.items()}
 
-        return filtered_devices
+        # a device must match every term, stop checking a device as soon as one term does not match
+        return [
+            device
+            for device in connected_devices
+            if all(
+                device.get(term) is not None and compiled.match(device[term])
+                for term, compiled in compiled_terms.items()
+            )
+        ]
 
     def update_dynamic_content(self, content_type: str) -> bool:
         """
@@ -1137,29 +1592,24 @@ class Panoply:
         :param content_type: type of content to check
         :return: version-number to download and install or None if already at the latest
         """
-        latest_version = ""
-        latest_version_first = 0
-        latest_version_second = 0
-        latest_version_current = "no"
-
         try:
             logger.info(f"Checking for newer {content_type}...")
             self.xapi.op(cmd=f"<request><{content_type}><upgrade><check/></upgrade></{content_type}></request>")
             er = self.xapi.element_root
 
-            for entry in er.findall(".//entry"):
-                version = entry.find("./version").text
-                current = entry.find("./current").text
-                # version will have the format 1234-1234
-                version_parts = version.split("-")
-                version_first = int(version_parts[0])
-                version_second = int(version_parts[1])
+            latest_version = None
+            latest_version_parts = ()
+            latest_version_current = "no"
 
-                if version_first > latest_version_first and version_second > latest_version_second:
+            for entry in er.iterfind(".//entry"):
+                version = entry.findtext("./version")
+                # version will have the format 1234-1234 or 1.234-1234, compare them as a tuple of ints
+                version_parts = tuple(int(x) for x in _CONTENT_VERSION_SPLIT_RE.split(version))
+
+                if version_parts > latest_version_parts:
                     latest_version = version
-                    latest_version_first = version_first
-                    latest_version_second = version_second
-                    latest_version_current = current
+                    latest_version_parts = version_parts
+                    latest_version_current = entry.findtext("./current")
 
             if latest_version_current == "yes":
                 return None
@@ -1176,12 +1626,14 @@ class Panoply:
         offline or otherwise unavailable.
 
         :param job_id: id the job to check and wait for
-        :param interval: how long to wait between checks
+        :param interval: maximum time to wait between checks in seconds
         :param timeout: how long to wait with no response before we give up
         :return: bool true on content updated, false otherwise
         """
         mark = time.time()
         timeout_mark = mark + timeout
+        # start polling quickly and back off up to the given interval
+        backoff = min(1.0, interval)
         logger.debug(f"Waiting for job id: {job_id} to finish...")
         while True:
 
@@ -1223,7 +1675,8 @@ class Panoply:
 
                 logger.info("Waiting a bit longer")
 
-            time.sleep(interval)
+            time.sleep(backoff + random.uniform(0, backoff * 0.25))
+            backoff = min(backoff * 2, interval)
 
     def get_configuration(self, config_source="running") -> str:
         """
@@ -1243,11 +1696,11 @@ class Panoply:
         elif config_source == "candidate":
             cmd = "show config candidate"
 
-        elif re.match(r"^-\d+$", str(config_source)):
+        elif _INVERTED_VERSION_RE.match(str(config_source)):
             # this is an inverted configuration version number (-1, -2, -3, etc)
             return self.__get_inverted_configuration_version(config_source)
 
-        elif re.match(r"^\d+$", str(config_source)):
+        elif _POSITIVE_VERSION_RE.match(str(config_source)):
             # normal configuration version id (13, 12, 10, etc)
             return self.get_configuration_version(config_source)
 
@@ -1284,10 +1737,9 @@ class Panoply:
                 if self.xapi.status != "success":
                     raise PanoplyException("Could not get saved configuration from the device")
 
-                doc_str = self.xapi.xml_result()
-
-                doc = etree.fromstring(doc_str)
-                return etree.tostring(doc, pretty_print=True).decode(encoding="UTF-8")
+                # the xapi result is an xml.etree element which lxml cannot serialize, serialize it once here and
+                # drop the whitespace tail that follows the element in the response
+                return ElementTree.tostring(self.xapi.element_result[0], encoding="unicode").rstrip()
 
             else:
                 return ""
@@ -1314,12 +1766,10 @@ class Panoply:
                 raise PanoplyException("Could not list saved configurations from the device")
 
             response_root = self.xapi.element_root
-            config_items = response_root.findall(".//completion")
-            for config in config_items:
-                if "value" in config.attrib:
-                    saved_configurations.append(config.attrib["value"])
 
-            return saved_configurations
+            return [
+                config.attrib["value"] for config in response_root.iterfind(".//completion") if "value" in config.attrib
+            ]
 
         except PanXapiError as pe:
             logger.error("Could not list configurations from device")
@@ -1346,10 +1796,9 @@ class Panoply:
                 if self.xapi.status != "success":
                     raise PanoplyException("Could not get configuration version from the device")
 
-                doc_str = self.xapi.xml_result()
-
-                doc = etree.fromstring(doc_str)
-                return etree.tostring(doc, pretty_print=True).decode(encoding="UTF-8")
+                # the xapi result is an xml.etree element which lxml cannot serialize, serialize it once here and
+                # drop the whitespace tail that follows the element in the response
+                return ElementTree.tostring(self.xapi.element_result[0], encoding="unicode").rstrip()
 
             else:
                 return ""
@@ -1373,8 +1822,8 @@ class Panoply:
         if len(versions) == 1:
             raise PanoplyException("PAN-OS does not have any previous configs available!")
 
-        # convert this list of str into list of int and sort it
-        sorted_versions = sorted(list(map(int, [x["version"] for x in versions])))
+        # convert the version ids into a sorted list of int
+        sorted_versions = sorted(int(x["version"]) for x in versions)
 
         try:
             # get the actual desired version id, note the highest numbered config id is actually the running
@@ -1399,13 +1848,13 @@ class Panoply:
                 raise PanoplyException("Could not list configuration versions from the device")
 
             response_root = self.xapi.element_root
-            config_items = response_root.findall(".//completion")
-            for config in config_items:
-                if "value" in config.attrib and config.attrib["value"] != "":
-                    v = {"version": config.attrib["value"], "date": config.attrib["help-string"]}
-                    versions.append(v)
 
-            return versions
+            return [
+                {"version": attrib["value"], "date": attrib["help-string"]}
+                for config in response_root.iterfind(".//completion")
+                for attrib in (config.attrib,)
+                if attrib.get("value")
+            ]
 
         except PanXapiError as pe:
             logger.error("Could not list configuration versions from device")
@@ -1430,7 +1879,14 @@ class Panoply:
             previous_config = self.xapi.xml_result()
 
         else:
-            previous_config = self.generate_baseline(reset_hostname=True)
+            baseline_key = (self.facts.get("sw-version"), self.facts.get("model"))
+            previous_config = self._baseline_cache.get(baseline_key, None) if None not in baseline_key else None
+
+            if previous_config is None:
+                previous_config = self.generate_baseline(reset_hostname=True)
+                # facts are guaranteed to be populated after generating the baseline
+                self._baseline_cache[(self.facts["sw-version"], self.facts["model"])] = previous_config
+
             self.xapi.op(cmd="show config running", cmd_xml=True)
             latest_config = self.xapi.xml_result()
 
@@ -1462,7 +1918,9 @@ class Panoply:
 
         for c in latest_doc:
             o_xpath = current_xpath + "/" + c.tag
-            these_not_found_xpaths = self.__check_element(c, o_xpath, previous_doc, [])
+            found_elements = previous_doc.xpath(o_xpath)
+            found_element = found_elements[0] if found_elements else None
+            these_not_found_xpaths = self.__check_element(c, o_xpath, found_element, [])
             not_found_xpaths.extend(these_not_found_xpaths)
 
         snippets = list()
@@ -1471,17 +1929,14 @@ class Panoply:
 
             # xpath comes as a relative full xpath like './mgt-config/password-complexity'
             # make it /config/mgt-config/password-complexity
-            full_xpath = re.sub(r"^\./", r"/config/", xpath)
+            full_xpath = _LEADING_DOT_RE.sub("/config/", xpath)
             # force full xpath for #52 - split off last bit like password-complexity
             set_xpath, entry = self.__split_xpath(full_xpath)
             # remove any attribute for tag name
-            tag = re.sub(r"\[.*\]", "", entry)
+            tag = _ATTRIBUTE_RE.sub("", entry)
 
-            # check if this xpath is actually user configurable
-            if self.__is_ignored_xpath(set_xpath):
-                continue
-
-            # in some cases we need to ignore xpath + element for example
+            # check if this xpath is actually user configurable. set_xpath is a prefix of full_xpath, so checking
+            # the full xpath also catches cases where we need to ignore xpath + element for example
             # /config/shared/content-preview
             if self.__is_ignored_xpath(full_xpath):
                 continue
@@ -1497,10 +1952,8 @@ class Panoply:
             cleaned_element = self.__clean_uuid(changed_element)
             xml_string = etree.tostring(cleaned_element, pretty_print=True, encoding="unicode")
 
-            random_name = str(int(random.random() * 1000000))
-
             snippet = dict()
-            snippet["name"] = f"{tag}-{random_name}"
+            snippet["name"] = f"{tag}-{next(self._snippet_counter)}"
             snippet["xpath"] = set_xpath
             snippet["element"] = xml_string.strip()
             snippet["full_xpath"] = xpath
@@ -1517,65 +1970,9 @@ class Panoply:
         :param set_xpath: xpath string to check
         :return: boolean true if the xpath should be skipped
         """
-        ignored_xpaths = (
-            '/config/mgt-config/users/entry[@name="admin"]',
-            "/config/shared/content-preview",
-            "/config/readonly",
-        )
-
-        for ignored_xpath in ignored_xpaths:
-            if ignored_xpath in set_xpath:
-                logger.debug(f"Skipping ignored xpath: {set_xpath}")
-                return True
-
-        return False
-
-    @staticmethod
-    def __is_ignored_set_cli(set_cli: str) -> bool:
-        """
-        Determines if the generated set cli can be used to recreate this configuration. Some generated
-        set clis are simply remnants of the XML structure and are not actually valid set cli commands
-
-        :param set_cli: set command to check
-        :return: bool True if this cli should be excluded
-        """
-
-        # ignore any set clis that start with this commands
-        ignored_set_prefix = (
-            "set mgt-config users admin phash",
-            "set shared content-preview",
-            "set read-only",
-            "set readonly",
-        )
-
-        # ignore any set cli that match these commands
-        ignored_set_cli = (
-            "set shared application",
-            "set shared application-group",
-            "set shared service",
-            "set shared service-group",
-        )
-
-        # ignore any set cli that contain these strings
-        ignored_set_cli_parts = (
-            "deviceconfig setting management initcfg",
-            "deviceconfig setting management disable-predefined-reports",
-        )
-
-        for prefix in ignored_set_prefix:
-            if set_cli.startswith(prefix):
-                logger.debug(f"Skipping ignore set cli prefix: {set_cli}")
-                return True
-
-        for ignorned_set in ignored_set_cli:
-            if set_cli == ignorned_set:
-                logger.debug(f"Skipping ignore set cli: {set_cli}")
-                return True
-
-        for part in ignored_set_cli_parts:
-            if part in set_cli:
-                logger.debug(f"Skipping ignored set cli with part: {set_cli}")
-                return True
+        if any(ignored_xpath in set_xpath for ignored_xpath in _IGNORED_XPATHS):
+            logger.debug(f"Skipping ignored xpath: {set_xpath}")
+            return True
 
         return False
 
@@ -1593,21 +1990,14 @@ class Panoply:
         p_config = PanConfig(previous_config)
         l_config = PanConfig(latest_config)
 
-        p_set = p_config.set_cli("set ", xpath="./")
+        # frozenset membership compares the cached string hash first and only falls back to a full string
+        # comparison when the hashes match, so no separate hash set is needed here
+        p_set = frozenset(p_config.set_cli("set ", xpath="./"))
         l_set = l_config.set_cli("set ", xpath="./")
 
-        # diffs = [item for item in l_set if item not in p_set]
-        diffs = list()
-
-        for cmd in l_set:
-
-            if cmd not in p_set:
-
-                if self.__is_ignored_set_cli(cmd):
-                    continue
-
-                cmd_cleaned = cmd.replace("\n", " ")
-                diffs.append(cmd_cleaned)
+        diffs = [
+            cmd.replace("\n", " ") for cmd in l_set if cmd not in p_set and not _is_ignored_set_cli(cmd)
+        ]
 
         return self.__order_set_commands(diffs)
 
@@ -1640,123 +2030,128 @@ class Panoply:
                 raise PanoplyException(f"Could not list completions from the device for xpath: {xpath}")
 
             response_root = self.xapi.element_root
-            config_items = response_root.findall(".//completion")
-            for config in config_items:
-                if "value" in config.attrib:
-                    completions.append(config.attrib["value"])
 
-            return completions
+            return [
+                config.attrib["value"] for config in response_root.iterfind(".//completion") if "value" in config.attrib
+            ]
 
         except PanXapiError as pe:
             logger.error("Could not list completions from device")
             logger.error(pe)
             raise PanoplyException(f"Could not list completions from the device for xpath: {xpath}")
 
-    def __check_element(self, el: etree.Element, xpath: str, pc: etree.Element, not_founds: list) -> list:
+    def __check_element(
+        self, el: etree.Element, xpath: str, found_element: Optional[etree.Element], not_founds: list
+    ) -> list:
         """
-        recursive function to determine if the 'el' Element found at 'xpath' can also be found at the same
-        xpath in the 'pc' previous_config. Keep tabs on what has not been found using the 'not_founds' list
+        Determine if the 'el' Element found at 'xpath' can also be found at the same xpath in the previous_config.
+        Descendants are walked depth first using an explicit stack. Keep tabs on what has not been found using the
+        'not_founds' list
 
         :param el: The element in question from the latest_config
         :param xpath: the xpath to the element in question
-        :param pc:  the previous config Element
+        :param found_element: the Element found at the same xpath in the previous config or None if not found
         :param not_founds: list of xpaths that have not been found
         :return: a list of xpaths that have not been found in the previous_config at this level
         """
 
-        # first, check the previous_config to see if this xpath exists there
-        found_elements = pc.xpath(xpath)
+        stack = [(el, xpath, found_element)]
+
+        while stack:
+            el, xpath, found_element = stack.pop()
 
-        if found_elements:
-            found_element = found_elements[0]
-            # this xpath exists in the previous_config, now iterate through all the children
-            children = el.findall("./")
+            # first, check the previous_config to see if this xpath exists there
+            if found_element is not None:
+                # this xpath exists in the previous_config, now iterate through all the children
+                children = el.findall("./")
 
-            if len(children) == 0:
-                # there are no children at this level, so check if the 'text' is different
+                if len(children) == 0:
+                    # there are no children at this level, so check if the 'text' is different
 
-                if found_element.text != el.text:
-                    # this xpath contains a text node that has been modified <port>6666</port> != <port>0000</port>
-                    not_founds.append(xpath)
-                # no need to go further as we have no children to descend into
-                return not_founds
+                    if found_element.text != el.text:
+                        # this xpath contains a text node that has been modified <port>6666</port> != <port>0000</port>
+                        not_founds.append(xpath)
+                    # no need to go further as we have no children to descend into
+                    continue
 
-            # we have children elements, first check if they are a list of identical elements
-            is_list = False
+                # we have children elements, first check if they are a list of identical elements
+                is_list = False
 
-            if self.__check_children_are_list(children):
-                # use the xmldiff library to check the list of elements
-                diffs = xmldiff_main.diff_trees(
-                    found_element, el, {"F": 0.1, "ratio_mode": "accurate", "fast_match": True}
-                )
+                if self.__check_children_are_list(children):
 
-                # all children are a list and there are no differences in them, so return up the stack
-                if len(diffs) == 0:
-                    return not_founds
+                    # most lists are unchanged, so skip the expensive xmldiff edit script when they are identical
+                    if _tree_fingerprint(found_element) == _tree_fingerprint(el):
+                        continue
+
+                    # use the xmldiff library to check the list of elements
+                    diffs = xmldiff_main.diff_trees(
+                        found_element, el, {"F": 0.1, "ratio_mode": "accurate", "fast_match": True}
+                    )
+
+                    # all children are a list and there are no differences in them, so move on
+                    if len(diffs) == 0:
+                        continue
 
-                else:
                     # we have a list and there ARE differences
                     is_list = True
 
-            # continue checking each child, either they are not a list or they are a list and there are diffs
-            # track the child index in case we find a diff in the list case
-            index = 1
-            # check each child now
-            for e in el:
+                # continue checking each child, either they are not a list or they are a list and there are diffs
+                # track the child index in case we find a diff in the list case
+                pending = list()
 
-                if e.attrib:
-                    attribs = list()
+                for index, e in enumerate(el, start=1):
 
-                    for k, v in e.attrib.items():
+                    if e.attrib:
+                        attribs = list()
 
-                        if k != "uuid":
-                            attribs.append(f'@{k}="{v}"')
+                        for k, v in e.attrib.items():
 
-                    # fix for #71
-                    attrib_str = " and ".join(attribs)
-                    # track the attributes in the xpath by virtue of the 'path_entry' which will be appended to the
-                    # xpath later
-                    path_entry = f"{e.tag}[{attrib_str}]"
+                            if k != "uuid":
+                                attribs.append(f'@{k}="{v}"')
 
-                else:
-                    # no attributes but this is a list, so include the index value in the xpath to check
-                    # this will be used to grab the changed element later, but will be removed from the xpath
-                    # as it is not necessary in PAN-OS (double check this please)
+                        # fix for #71
+                        attrib_str = " and ".join(attribs)
+                        # track the attributes in the xpath by virtue of the 'path_entry' which will be appended to
+                        # the xpath later
+                        path_entry = f"{e.tag}[{attrib_str}]"
+
+                    else:
+                        # no attributes but this is a list, so include the index value in the xpath to check
+                        # this will be used to grab the changed element later, but will be removed from the xpath
+                        # as it is not necessary in PAN-OS (double check this please)
 
-                    if is_list:
+                        if is_list:
 
-                        if e.text.strip() != "":
-                            path_entry = f'{e.tag}[text()="{e.text.strip()}"]'
+                            if e.text.strip() != "":
+                                path_entry = f'{e.tag}[text()="{e.text.strip()}"]'
+
+                            else:
+                                path_entry = f"{e.tag}[{index}]"
 
                         else:
-                            path_entry = f"{e.tag}[{index}]"
+                            # just append the tag to the xpath and move on
+                            path_entry = e.tag
+
+                    # only search the children of the previous element rather than the entire previous_config
+                    found_children = found_element.xpath(path_entry)
+                    found_child = found_children[0] if found_children else None
+                    pending.append((e, xpath + "/" + path_entry, found_child))
+
+                # push the children in reverse so they are popped, and reported, in document order
+                stack.extend(reversed(pending))
+                continue
+
+            # check this element to determine if it's 'blank'
+            if len(el.findall("./")) == 0 and not el.attrib and (not el.text or not el.text.strip()):
+                continue
+
+            not_founds.append(xpath)
 
-                    else:
-                        # just append the tag to the xpath and move on
-                        path_entry = e.tag
-
-                # craft our new xpath to check
-                n_xpath = xpath + "/" + path_entry
-                # do it all over again
-                new_not_founds = self.__check_element(e, n_xpath, pc, list())
-                # add any child xpaths that weren't found with any found here for return up the stack
-                not_founds.extend(new_not_founds)
-                # increase our index for the next iteration
-                index = index + 1
-
-            # return our findings up the stack
-            return not_founds
-
-        # check this element to determine if it's 'blank'
-        if len(el.findall("./")) == 0 and not el.attrib and (not el.text or not el.text.strip()):
-            return not_founds
-
-        not_founds.append(xpath)
         return not_founds
 
     @staticmethod
     def __split_xpath(xpath: str) -> Tuple[str, str]:
-        xpath_parts = re.split(r'/(?=(?:[^"]*"[^"]*")*[^"]*$)', xpath)
+        xpath_parts = _XPATH_SPLIT_RE.split(xpath)
         new_xpath = "/".join(xpath_parts[:-1])
         entry = xpath_parts[-1]
 
@@ -1774,27 +2169,36 @@ class Panoply:
         # but at least make the attempt
 
         xpaths, post_xpaths = self.get_ordered_xpaths()
+        # find the leaf xpath of each snippet once for all xpaths we filter by
+        leaf_xpaths = _compute_leaf_xpaths(snippets)
 
+        # snippets are unhashable dicts, so track the ids of those already ordered to avoid scanning the lists
         ordered_snippets = list()
+        ordered_ids = set()
         for x in xpaths:
-            found_snippets = self.__filter_snippets_by_xpath(snippets, x)
+            found_snippets = self.__filter_snippets_by_xpath(snippets, x, leaf_xpaths)
             for s in found_snippets:
-                if s not in ordered_snippets:
+                if id(s) not in ordered_ids:
+                    ordered_ids.add(id(s))
                     ordered_snippets.append(s)
 
         post_snippets = list()
+        post_ids = set()
         for p in post_xpaths:
-            filtered_snippets = self.__filter_snippets_by_xpath(snippets, p)
+            filtered_snippets = self.__filter_snippets_by_xpath(snippets, p, leaf_xpaths)
             for f in filtered_snippets:
-                if f not in post_snippets:
+                if id(f) not in post_ids:
+                    post_ids.add(id(f))
                     post_snippets.append(f)
 
         for s in snippets:
-            if s not in ordered_snippets and s not in post_snippets:
+            if id(s) not in ordered_ids and id(s) not in post_ids:
+                ordered_ids.add(id(s))
                 ordered_snippets.append(s)
 
         for ps in post_snippets:
-            if ps not in ordered_snippets:
+            if id(ps) not in ordered_ids:
+                ordered_ids.add(id(ps))
                 ordered_snippets.append(ps)
 
         return ordered_snippets
@@ -1809,40 +2213,32 @@ class Panoply:
         :return: a list of ordered set commands
         """
 
-        ordered_set_commands = list()
-
-        fake_snippets = list()
-
-        # little bit of a hack here
-        # our set commands can contain slashes like `set mgmt-config ip-address 10.10.10.1/24` and we ultimately
-        # need to convert this to xpath format for ordering purposes `set/mgt-confg/ip-address/10.10.10.1/24`
-        # so, let's do a simple replacement of any valid forward slashes before hand
-        slash_marker = "****"
+        fake_snippets = []
+        seen_xpaths = set()
 
         for set_cmd in set_commands:
-            snippet = dict()
-            snippet["full_xpath"] = (
+            full_xpath = (
                 set_cmd.replace(
                     "devices localhost.localdomain vsys vsys1 log-settings profiles", "shared log-settings profiles"
                 )
                 .replace("devices localhost.localdomain vsys vsys1 ", "")
                 .replace("devices localhost.localdomain ", "")
                 .replace("set ", "")
-                .replace("/", slash_marker)
-                .replace(" ", "/")
+                .translate(_SET_CLI_TO_XPATH)
             )
-            fake_snippets.append(snippet)
+            # snippets are de-duplicated by identity when ordered, so drop any repeated xpaths here
+            if full_xpath not in seen_xpaths:
+                seen_xpaths.add(full_xpath)
+                fake_snippets.append({"full_xpath": full_xpath})
 
         ordered_fake_snippets = self.__order_snippets(fake_snippets)
 
-        for fake_snippet in ordered_fake_snippets:
-            new_set_command = fake_snippet["full_xpath"].replace("/", " ").replace(slash_marker, "/")
-            ordered_set_commands.append(f"set {new_set_command}")
-
-        return ordered_set_commands
+        return [
+            f'set {fake_snippet["full_xpath"].translate(_XPATH_TO_SET_CLI)}' for fake_snippet in ordered_fake_snippets
+        ]
 
     @staticmethod
-    def __filter_snippets_by_xpath(snippets: list, xpath: str) -> list:
+    def __filter_snippets_by_xpath(snippets: list, xpath: str, leaf_xpaths: Optional[list] = None) -> list:
         """
         Check each snippet in the list and return those that have a full_xpath matching the xpath param. This is
         done by finding the specific leaf node of the xpath by using only the xpath portions after any template, device,
@@ -1851,27 +2247,25 @@ class Panoply:
 
         :param snippets: list of snippets
         :param xpath: xpath to check
+        :param leaf_xpaths: optional sorted list of leaf xpaths for these snippets as returned by
+        _compute_leaf_xpaths. Pass this in when filtering the same snippets by multiple xpaths
         :return: list of only those that contain the xpath in their full_xpath attribute
         """
-        filtered_snippets = list()
-
-        split_pattern = re.compile(r"/devices/.*?/|vsys/.*?/")
+        if leaf_xpaths is None:
+            leaf_xpaths = _compute_leaf_xpaths(snippets)
 
-        for s in snippets:
-            full_xpath = s.get("full_xpath", "")
+        # leaf xpaths are sorted, so all those starting with this xpath are found together starting from here
+        index = bisect_left(leaf_xpaths, (xpath,))
+        positions = []
 
-            split_xpath = split_pattern.split(full_xpath)
-            leaf_xpath_initial = split_xpath[-1]
+        while index < len(leaf_xpaths) and leaf_xpaths[index][0].startswith(xpath):
+            positions.append(leaf_xpaths[index][1])
+            index += 1
 
-            # handle cases like ./mgt-config/password-complexity - remove the leading './'
-            leaf_xpath = re.sub(r"^\./", "", leaf_xpath_initial)
-            if leaf_xpath.startswith(xpath):
-                # note we do not remove found snippets from the source snippets list, which may result
-                # in duplicates. The calling code will need to ensure it does not append the results of this method
-                # with out checking for dups first
-                filtered_snippets.append(s)
-
-        return filtered_snippets
+        # note we do not remove found snippets from the source snippets list, which may result
+        # in duplicates. The calling code will need to ensure it does not append the results of this method
+        # with out checking for dups first
+        return [snippets[position] for position in sorted(positions)]
 
     @staticmethod
     def __check_children_are_list(c: list) -> bool:
@@ -1889,27 +2283,18 @@ class Panoply:
             # can't be a list of identical items if there are only 0 or 1 items
             return False
 
-        found_tag_name = ""
-
-        for child in c:
-
-            # if any child itself has children, then this is not a list of identical items. Return False here
-            if len(child):
-                return False
-
-            if found_tag_name == "":
-                found_tag_name = child.tag
-                continue
-
-            if found_tag_name != child.tag:
-                return False
-
-        return True
+        # if any child itself has children, or has a different tag, then this is not a list of identical items
+        first_tag = c[0].tag
+        return all(child.tag == first_tag and not len(child) for child in c)
 
     def generate_skillet_from_configs_old(self, previous_config: str, latest_config: str) -> list:
         # use the excellent xmldiff library to get a list of changed elements
+        # only inserted nodes and updated text are used from the diff, so skip the slow 'accurate' ratio mode. PAN-OS
+        # entries are uniquely identified by their name attribute, which lets xmldiff match them directly
         diffs = xmldiff_main.diff_texts(
-            previous_config, latest_config, {"F": 0.1, "ratio_mode": "accurate", "fast_match": True}
+            previous_config,
+            latest_config,
+            {"F": 0.5, "ratio_mode": "fast", "fast_match": True, "uniqueattrs": ["name"]},
         )
         # THIS IS BROKEN
         # diffs = xmldiff_main.diff_texts(previous_config, latest_config)
@@ -1917,99 +2302,75 @@ class Panoply:
         # InsertNode(target='/config/shared[1]', tag='log-settings', position=2)
         # InsertNode(target='/config/shared/log-settings[1]', tag='http', position=0)
         # keep a list of found xpaths
-        fx = list()
+        fx = []
 
         # also track nodes with updated text
-        updated_text_snippets = list()
+        updated_text_snippets = []
 
-        snippets = list()
+        snippets = []
         # keep a dict of targets to xpaths
-        xpaths = dict()
-
-        # convert the config string to an xml doc
-        latest_doc = ElementTree.fromstring(latest_config)
+        xpaths = {}
+        # and a dict of the partial xpaths normalized along the way
+        normalized_paths = {}
 
-        for d in diffs:
-            logger.debug(d)
-            # step 1 - find all inserted nodes (future enhancement can consider other types of detected changes as well
+        # only inserted nodes and updated text are considered at this time (future enhancement can consider other
+        # types of detected changes as well)
+        insert_diffs = [d for d in diffs if isinstance(d, InsertNode)]
+        text_diffs = [d for d in diffs if isinstance(d, UpdateTextIn)]
 
-            if "InsertNode" in str(d):
+        # convert the config string to an xml doc, only materializing the elements along the changed xpaths
+        changed_xpaths = {f"{d.target}/{d.tag}" for d in insert_diffs}
+        changed_xpaths.update(d.node for d in text_diffs)
+        latest_doc = _parse_changed_elements(latest_config, changed_xpaths)
 
-                if d.target not in xpaths:
-                    d_xpath = self.__normalize_xpath(latest_doc, d.target)
-                    xpaths[d.target] = d_xpath
+        # index all elements by xpath once instead of searching the document for each part of each diffs xpath
+        latest_index = _build_xpath_index(latest_doc)
 
-                else:
-                    d_xpath = xpaths[d.target]
+        # index the full xpath (target without the trailing index plus the tag) of every inserted node once, so we
+        # do not need to iterate all diffs again for each inserted node to find parent / child relationships
+        inserted_xpaths = {f'{_TRAILING_INDEX.sub("", e.target)}/{e.tag}' for e in insert_diffs}
 
-                # we have an inserted node, step2 determine if it's a top level element or a child of another element
-                # xmldiff will return even inserted nodes in elements that have already been inserted
-                # for purposes of building a skillet, we only need the top most unique element
-                # d_target = re.sub(r'\[\d+\]$', '', d.target)
-                # d_full = f'{d_target}/{d.tag}'
-                # has this element been found to be a child of another element?
-                found = False
-                # iter all diffs again to verify if this element is actually a child element or a top level element
+        # a parent xpath can only be found at the start of a target, so only check prefixes of these lengths
+        inserted_lengths = sorted({len(x) for x in inserted_xpaths})
 
-                for e in diffs:
-                    # again only consider inserted nodes for now
-                    if "InsertNode" in str(e):
-
-                        if e.target not in xpaths:
-                            e_xpath = self.__normalize_xpath(latest_doc, e.target)
-                            xpaths[e.target] = e_xpath
+        for d in insert_diffs:
+            logger.debug(d)
+            # step 1 - find all inserted nodes
+            if d.target not in xpaths:
+                d_xpath = self.__normalize_xpath(latest_doc, d.target, normalized_paths, latest_index)
+                xpaths[d.target] = d_xpath
 
-                        else:
-                            e_xpath = xpaths[e.target]
-
-                        e_target = re.sub(r"\[\d+\]$", "", e.target)
-                        e_full = f"{e_target}/{e.tag}"
-                        # begin checking for child / parent or equality relationship
-
-                        if e.target == d.target and d.tag == e.tag and d.position == e.position:
-                            # this is the same diff
-                            pass
-
-                        elif e.target == d.target and d.tag == e.tag and d.position != e.position:
-                            # new tag under an existing one possible
-                            pass
-
-                        elif e.target == d.target and d.tag == e.tag:
-                            # same target and same tag indicate another entry under the same top-level tag
-                            # do not keep this as a top-level element
-                            found = True
-                            logger.debug("same target, same tag")
-                            logger.debug(e)
-                            logger.debug("---")
-                            break
-
-                        elif e.target != d.target and e_full in d.target:
-                            # the targets are not the same and this diffs target is found to be 'in' the outer diff
-                            # target, therefore this cannot be a top level element
-                            found = True
-                            logger.debug("e_full in d.target")
-                            logger.debug(e_full)
-                            logger.debug("---")
-                            break
-
-                if not found:
-                    # we have not found this to be a child or peer of another element
-                    # therefore this must be a top-level element, let's keep it for future work
-                    logger.debug(f"Appending {d} to list of changes")
-                    fx.append(d)
-
-            elif "UpdateTextIn" in str(d):
-                snippet = dict()
-                normalized_xpath = self.__normalize_xpath(latest_doc, d.node)
-                xpath_parts = normalized_xpath.split("/")
-                xpath = "/".join(xpath_parts[:-1])
-                tag = xpath_parts[-1]
-                relative_xpath = re.sub(r"^\./", "/config/", xpath)
-                random_name = str(int(random.random() * 1000000))
-                snippet["name"] = f"{tag}-{random_name}"
-                snippet["xpath"] = relative_xpath
-                snippet["element"] = f"<{tag}>{d.text}</{tag}>"
-                updated_text_snippets.append(snippet)
+            else:
+                d_xpath = xpaths[d.target]
+
+            # we have an inserted node, step2 determine if it's a top level element or a child of another element
+            # xmldiff will return even inserted nodes in elements that have already been inserted
+            # for purposes of building a skillet, we only need the top most unique element
+            # d_target = re.sub(r'\[\d+\]$', '', d.target)
+            # d_full = f'{d_target}/{d.tag}'
+            # has this element been found to be a child of another element? This is the case when the full
+            # xpath of any other inserted node is found at the start of this diffs target
+            found = any(d.target[:length] in inserted_xpaths for length in inserted_lengths if length <= len(d.target))
+
+            if not found:
+                # we have not found this to be a child or peer of another element
+                # therefore this must be a top-level element, let's keep it for future work
+                logger.debug(f"Appending {d} to list of changes")
+                fx.append(d)
+
+        # step 3 - create snippets for all nodes with updated text
+        for d in text_diffs:
+            logger.debug(d)
+            snippet = {}
+            normalized_xpath = self.__normalize_xpath(latest_doc, d.node, normalized_paths, latest_index)
+            xpath_parts = normalized_xpath.split("/")
+            xpath = "/".join(xpath_parts[:-1])
+            tag = xpath_parts[-1]
+            relative_xpath = _LEADING_DOT_RE.sub("/config/", xpath)
+            snippet["name"] = f"{tag}-{next(self._snippet_counter)}"
+            snippet["xpath"] = relative_xpath
+            snippet["element"] = f"<{tag}>{d.text}</{tag}>"
+            updated_text_snippets.append(snippet)
 
         # we have found changes in the latest_config
         if fx:
@@ -2020,30 +2381,25 @@ class Panoply:
                 # account for position if supplied
                 # f_target_str = xpaths[f.target]
 
-                f_tag = f.tag
-
-                if hasattr(f, "position"):
-                    f_tag = f"{f.tag}[{f.position}]"
+                # fx only contains InsertNode actions, which always include the position
+                f_tag = f"{f.tag}[{f.position}]"
 
                 if f.target in xpaths:
                     f_target_str = xpaths[f.target]
 
                 else:
-                    f_target_str = self.__normalize_xpath(latest_doc, f.target)
+                    f_target_str = self.__normalize_xpath(latest_doc, f.target, normalized_paths, latest_index)
                     xpaths[f.target] = f_target_str
 
-                f_target_str_relative = re.sub(r"^\./", "/config/", f_target_str)
+                f_target_str_relative = _LEADING_DOT_RE.sub("/config/", f_target_str)
                 changed_short_xpath = f"{f_target_str}/{f_tag}"
                 # get this element from the latest config xml document
-                changed_element_dirty = latest_doc.find(changed_short_xpath)
-                changed_element = self.__clean_uuid(changed_element_dirty)
-                # keep a string of changes
-                xml_string = ""
+                changed_element = latest_doc.find(changed_short_xpath)
                 # we can't just dump out the changed element because it'll contain the 'tag' as the outermost tag
-                # so, find all the children of this 'tag' and append them to the xml_string
-
-                for child_element in changed_element.findall("./"):
-                    xml_string += ElementTree.tostring(child_element).decode(encoding="UTF-8")
+                # so, join all the children of this 'tag' into a string of changes
+                xml_string = "".join(
+                    ElementTree.tostring(child_element, encoding="unicode") for child_element in changed_element
+                )
 
                 if xml_string == "":
                     # if changed_element.text:
@@ -2055,29 +2411,22 @@ class Panoply:
                     logger.debug("****************")
                     continue
 
-                snippet = dict()
-                random_name = str(int(random.random() * 1000000))
-                snippet["name"] = f"{f.tag}-{random_name}"
+                snippet = {}
+                snippet["name"] = f"{f.tag}-{next(self._snippet_counter)}"
                 snippet["xpath"] = f"{f_target_str_relative}/{f_tag}"
                 snippet["element"] = xml_string.strip()
                 snippet["from_insert"] = True
                 # now print out to the end user
                 snippets.append(snippet)
 
-        text_update_snippets_to_include = list()
+        text_update_snippets_to_include = []
         if updated_text_snippets:
 
-            for ut_snippet in updated_text_snippets:
-                found = False
-
-                for snippet in snippets:
+            existing_xpaths = {snippet["xpath"] for snippet in snippets}
 
-                    if snippet["xpath"] in ut_snippet["xpath"]:
-                        # logger.debug('This text snippet is a child of one already included')
-                        found = True
-                        break
-
-                if not found:
+            for ut_snippet in updated_text_snippets:
+                # skip text snippets that are a child of one already included
+                if not any(x in ut_snippet["xpath"] for x in existing_xpaths):
                     text_update_snippets_to_include.append(ut_snippet)
 
         snippets.extend(text_update_snippets_to_include)
@@ -2112,7 +2461,9 @@ class Panoply:
         return changed_element
 
     @staticmethod
-    def __normalize_xpath(document: Element, xpath: str) -> str:
+    def __normalize_xpath(
+        document: Element, xpath: str, cache: Optional[dict] = None, index: Optional[dict] = None
+    ) -> str:
         """
         create an xpath with all attributes included. The xpaths generated from the diffing library
         are guaranteed to be unique and valid against this configuration file, however, they are not
@@ -2121,29 +2472,56 @@ class Panoply:
         xpath before returning it.
         :param document: ElementTree.Element that represents the configuration from which the diff were produced
         :param xpath: the xpath of the node in question, which may be indexed and have no attributes included
+        :param cache: optional dict of already normalized partial xpaths for this document. Partial xpaths normalized
+        here are added to it, so xpaths sharing a parent do not search the document again
+        :param index: optional dict of relative xpath to Element as built by _build_xpath_index, used to look up each
+        part of the xpath instead of searching the document
         :return: the fully normalized xpath which includes all the attributes included and the indexes removed
         """
         # Example xpath: /config/mgt-config/users/entry/phash[1]
         # the xpath will be absolute, change it here to be relative so we can search the document
-        relative_xpath = re.sub("^/config/", "./", xpath)
+        relative_xpath = _CONFIG_PREFIX.sub("./", xpath, count=1)
         # split the xpath into it's parts
         parts = relative_xpath.split("/")
         # xpath is now: ['.', 'mgt-config', 'users', 'entry', 'phash[1]']
         # begin constructing the new partial xpath. We will iteratively add additional parts, checking each one for
         # attributes that should be added
         path = ""
+        # track the partial xpath as given to look up and store normalized partial xpaths in the cache
+        raw_path = ""
+
+        if cache is None:
+            cache = dict()
 
         for p in parts:
 
             if p == ".":
                 # skip checking the root node, don't care about attributes here in the xpath
                 path = p
+                raw_path = p
                 continue
+
+            raw_path = raw_path + "/" + p
+
+            if raw_path in cache:
+                path = cache[raw_path]
+                continue
+
             # add the next part to the previous, adding the '/'
             # example xpath: ./mgt-config/users/entry
             path = path + "/" + p
             logger.debug(f"Checking path: {path}")
-            el = document.find(path)
+            el = None
+
+            if index is not None:
+                el = index.get(raw_path)
+
+                if el is None:
+                    # xmldiff always includes the index on the last part of the xpath, even when it is not required
+                    el = index.get(_TRAILING_ONE_INDEX.sub("", raw_path))
+
+            if el is None:
+                el = document.find(path)
 
             if el is None:
                 # this should never happen as the xpath was found in the document we are checking
@@ -2159,9 +2537,9 @@ class Panoply:
                 for k, v in el.attrib.items():
                     attrib_str += f'[@{k}="{v}"]'
 
-                if re.match(r".*\[\d+\]$", path):
+                if _TRAILING_INDEX.search(path):
                     logger.debug("replacing indexed element with attribute named")
-                    path = re.sub(r"\[\d+\]$", f"{attrib_str}", path)
+                    path = _TRAILING_INDEX.sub(attrib_str, path)
 
                 else:
                     path = path + attrib_str
@@ -2169,10 +2547,12 @@ class Panoply:
                 # example xpath is now: ./mgt-config/users/entry[@name="admin"]/phash[1]
 
             else:
-                path = re.sub(r"\[\d+\]", "", path)
+                path = _ANY_INDEX.sub("", path)
                 # now removing the index from items that do not have attributes
                 # example xpath now: ./mgt-config/users/entry[@name="admin"]/phash
 
+            cache[raw_path] = path
+
         logger.debug(f"returning {path}")
 
         return path
@@ -2184,39 +2564,9 @@ class Panoply:
 
         Will be enhanced one day with version and model specific information if necessary
 
-        :return: tuple of two lists, xpaths and post_xpaths
-        """
-        xpaths = [
-            "shared/certificate",
-            "shared/ssl-tls-service-profile",
-            "shared/tag",
-            "shared/profiles",
-            "shared/reports",
-            "shared/",  # catch the rest of the shared items here
-            "tag/",
-            "deviceconfig/system",
-            "network/profiles",
-            "network/interface",
-            "network/virtual-wire",
-            "network/vlan",
-            "network/ike",
-            "network/tunnel",
-            "import/network/interface",  # for use with panorama plugin import (SD-WAN)
-            "network/virtual-router",
-            "network/profiles/zone-protection-profile",
-            "routing-table/ip/static-route/entry/next-hop",  # try to keep next-hop before path-monitor for set cli
-            "routing-table/ip/static-route/entry/path-monitor",  # #70
-            "dynamic-ip-and-port/interface-address",  # GH #70
-            "dynamic-ip-and-port/interface",  # GH #70
-            "dynamic-ip-and-port/ip",  # GH #70
-            "zone/",
-            "profiles/custom-url-category",  # should come before profiles/url-filtering
-            "address/",  # should come before rules or address-group
-        ]
-
-        post_xpaths = ["rulebase"]
-
-        return xpaths, post_xpaths
+        :return: tuple of two tuples, xpaths and post_xpaths
+        """
+        return _ORDERED_XPATHS, _POST_XPATHS
 
 
 class EphemeralPanos(Panoply):
@@ -20,6 +20,7 @@ import shutil
 
 from skilletlib.exceptions import SkilletLoaderException
 
+# the availability of git is checked once at import time, Git instances only consult this flag
 HAS_GIT = True
 try:
     from git import Repo
@@ -29,6 +30,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# skillets only need the current tree, so avoid transferring the full history of the repository
+_CLONE_OPTIONS = ["--depth=1", "--single-branch"]
+
 
 class Git:
     """
@@ -65,7 +69,7 @@ class Git:
             raise SkilletLoaderException('A git client must be installed to clone repos!')
 
         self.name = name
-        path = self.store + os.sep + name
+        path = os.path.join(self.store, name)
         self.path = path
 
         if os.path.exists(path):
@@ -77,7 +81,7 @@ class Git:
 
                 try:
                     # only recourse is to remove the .git directory
-                    if os.path.exists(os.path.join(path, '.git')):
+                    if os.path.isdir(os.path.join(path, '.git')):
                         shutil.rmtree(path)
 
                     else:
@@ -89,7 +93,7 @@ class Git:
                 logger.debug("Cloning into {}".format(path))
 
                 try:
-                    self.Repo = Repo.clone_from(self.repo_url, path)
+                    self.Repo = Repo.clone_from(self.repo_url, path, multi_options=_CLONE_OPTIONS)
 
                     # ensure all submodules are also updated and available
                     self.Repo.submodule_update(recursive=False)
@@ -101,7 +105,7 @@ class Git:
                 logger.debug("Updating repository...")
 
                 try:
-                    self.Repo.remotes.origin.pull()
+                    self.__update()
 
                 except GitCommandError as gce:
                     logger.error('Could not clone repository!')
@@ -111,11 +115,36 @@ class Git:
 
         else:
             logger.debug("Cloning into {}".format(path))
-            self.Repo = Repo.clone_from(self.repo_url, path)
+            self.Repo = Repo.clone_from(self.repo_url, path, multi_options=_CLONE_OPTIONS)
 
         self.path = path
         return path
 
+    def __update(self) -> None:
+        """
+        Fetch from the origin remote and only pull when the current branch is behind. This avoids a merge and
+        working tree update when the repository is already up to date.
+
+        :return: None
+        """
+        origin = self.Repo.remotes.origin
+        origin.fetch()
+
+        try:
+            remote_ref = origin.refs[self.Repo.active_branch.name]
+
+        except (TypeError, IndexError):
+            # detached HEAD or no matching remote branch, fall back to a regular pull
+            origin.pull()
+            return
+
+        if self.Repo.head.commit != remote_ref.commit:
+            logger.debug("Local branch is behind the remote, pulling changes")
+            origin.pull(ff_only=True)
+
+        else:
+            logger.debug("Repository is already up to date")
+
     def branch(self, branch_name: str) -> None:
         """
         Checkout the specified branch.
@@ -132,8 +161,40 @@ class Git:
             logger.debug("Updating branch.")
             self.Repo.remotes.origin.pull()
 
+        # repos are cloned with a single branch and no history, so fetch the requested branch or tag first
+        self.__fetch_ref(branch_name)
         self.Repo.git.checkout(branch_name)
 
+    def __fetch_ref(self, ref_name: str) -> None:
+        """
+        Fetch the tip of the given branch or tag from the origin remote so it can be checked out of a shallow clone
+
+        :param ref_name: name of the branch or tag to fetch
+        :return: None
+        """
+        origin = self.Repo.remotes.origin
+
+        branch_refspec = f"+refs/heads/{ref_name}:refs/remotes/origin/{ref_name}"
+
+        try:
+            origin.fetch(branch_refspec, depth=1)
+
+            # track this branch as well so checkout can create the local branch from the remote one
+            if branch_refspec not in self.Repo.git.config("--get-all", "remote.origin.fetch").splitlines():
+                self.Repo.git.config("--add", "remote.origin.fetch", branch_refspec)
+
+            return
+
+        except GitCommandError:
+            logger.debug(f"{ref_name} is not a branch on origin")
+
+        try:
+            origin.fetch(f"+refs/tags/{ref_name}:refs/tags/{ref_name}", depth=1)
+            return
+
+        except GitCommandError:
+            logger.debug(f"Could not fetch {ref_name} from origin, attempting to checkout as is")
+
     def get_submodule_dirs(self, path=None) -> list:
         """
         Return a list of submodule directories if any. This is used to load and resolve skillets into the
@@ -15,6 +15,7 @@
 # Authors: Adam Baumeister, Nathan Embery
 
 import copy
+import functools
 import html
 import logging
 import os
@@ -25,6 +26,7 @@ from abc import abstractmethod
 from pathlib import Path
 from typing import Generator
 from typing import List
+from typing import Optional
 
 import yaml
 from jinja2 import TemplateError
@@ -40,10 +42,78 @@ from skilletlib.snippet.template import SimpleTemplateSnippet
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-if not len(logger.handlers):
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(logging.DEBUG)
-    logger.addHandler(handler)
+# follow the library convention and let the application decide where log records go, see _add_stream_handler
+logger.addHandler(logging.NullHandler())
+
+# variable type_hints that offer a list of key / value choices and the attribute holding that list
+_LIST_FIELD = {'dropdown': 'dd_list', 'radio': 'rad_list', 'checkbox': 'cbx_list'}
+
+# maximum time in seconds to wait for a running snippet to complete
+_SNIPPET_TIMEOUT = 300
+
+
+def _poll_interval(attempt: int) -> float:
+    """
+    Return the time to wait before polling a running snippet again. Starts small so fast snippets return quickly
+    and backs off exponentially to a maximum of 5 seconds
+
+    :param attempt: number of times the snippet has been polled already
+    :return: number of seconds to sleep
+    """
+    return min(0.1 * 2 ** attempt, 5.0)
+
+
+def _add_stream_handler(force: bool) -> None:
+    """
+    Print log records to stdout when the application has not configured logging itself, or when debugging has been
+    requested. This is deferred until a Skillet is created so importing this module never installs a handler
+
+    :param force: add the handler even if the application has configured logging, i.e. when SKILLET_DEBUG is set
+    :return: None
+    """
+    if any(type(h) is logging.StreamHandler for h in logger.handlers):
+        return
+
+    if force or not logging.getLogger().handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+
+
+# Custom YAML dumper to inject appropriate white-space. This must remain based on the pure python SafeDumper, the
+# libyaml CSafeDumper emits in C and would never call write_line_break below
+class SkilletYamlDumper(yaml.SafeDumper):
+    def write_line_break(self, data=None):
+        super().write_line_break(data)
+        if len(self.indents) < 3:
+            super().write_line_break()
+
+    # we should not use anchors in YAML at all for this
+    def ignore_aliases(self, data):
+        return True
+
+
+# Add a str presenter for multi-line text
+def _str_presenter(dumper, data):
+    if len(data.splitlines()) > 1:
+        return dumper.represent_scalar("tag:yaml.org,2002:str", data, style="|")
+    return dumper.represent_scalar("tag:yaml.org,2002:str", data)
+
+
+SkilletYamlDumper.add_representer(str, _str_presenter)
+
+
+@functools.lru_cache(maxsize=256)
+def _read_template(template_path: Path, mtime_ns: int) -> str:
+    """
+    Read and unescape a template file. Results are cached by path and modification time, so repeated loads of the
+    same file do not hit the disk again while changes to the file are still picked up
+
+    :param template_path: resolved path to the template file
+    :param mtime_ns: modification time of the template file, only used as part of the cache key
+    :return: str contents
+    """
+    return html.unescape(template_path.read_text(encoding='utf-8'))
 
 
 class Skillet(ABC):
@@ -62,6 +132,8 @@ class Skillet(ABC):
 
         self.success = True
 
+        _add_stream_handler(bool(os.environ.get('SKILLET_DEBUG', False)))
+
         self.skillet_dict = self.__normalize_skillet_dict(s)
         self.name = self.skillet_dict['name']
         self.label = self.skillet_dict['label']
@@ -70,17 +142,21 @@ class Skillet(ABC):
         self.type = self.skillet_dict['type']
         self.supported_versions = 'not implemented'
         self.variables = self.__initialize_variables(s['variables'])
+        # index the default value of each variable by name for quick context updates
+        self._var_defaults = {v['name']: v.get('default', '') for v in self.variables}
         # path is needed only when snippets are held in a relative file path
         self.path = self.skillet_dict.get('snippet_path', '')
         self.filename = self.skillet_dict.get('skillet_filename', '.meta-cnc.yaml')
         self.labels = self.skillet_dict['labels']
-        self.collections = self.skillet_dict['labels'].get('collection', list())
         self.context = dict()
         self.captured_outputs = dict()
         self.snippet_outputs = dict()
+        # built on first use by _parse_output_template when the output_template label is present
+        self._output_template_snippet = None
 
         # ensure all values are set appropriately in the snippet definition
-        self.__validate_snippet_metadata()
+        # and keep the snippet names in the order they are defined, used to collect results after execution
+        self._ordered_snippet_names = self.__validate_snippet_metadata()
 
         # initialize our snippets
         self.snippets = self.get_snippets()
@@ -93,6 +169,25 @@ class Skillet(ABC):
         if debug:
             logger.setLevel(logging.DEBUG)
 
+    @property
+    def collections(self) -> list:
+        """
+        The collections this skillet belongs to, as found in the 'collection' label
+
+        :return: list of collection names
+        """
+        return self.labels.get('collection', list())
+
+    @collections.setter
+    def collections(self, collections: list) -> None:
+        """
+        Set the collections this skillet belongs to, these are kept in the 'collection' label
+
+        :param collections: list of collection names
+        :return: None
+        """
+        self.labels['collection'] = collections
+
     @abstractmethod
     def get_snippets(self) -> List[Snippet]:
         """
@@ -101,12 +196,10 @@ class Skillet(ABC):
 
         :return: List of Snippets for this Skillet Class
         """
-        snippet_list = list()
-        for snippet_def in self.snippet_stack:
-            snippet = Snippet(snippet_def)
-            snippet_list.append(snippet)
+        if hasattr(self, 'snippets'):
+            return self.snippets
 
-        return snippet_list
+        return [Snippet(snippet_def) for snippet_def in self.snippet_stack]
 
     def load_template(self, template_path: str) -> str:
         """
@@ -122,17 +215,19 @@ class Skillet(ABC):
         skillet_path = Path(self.path)
         template_file = skillet_path.joinpath(template_path).resolve()
 
-        if template_file.exists():
-            with template_file.open(encoding='utf-8') as sf:
-                return html.unescape(sf.read())
+        try:
+            # a single stat both checks the file exists and provides the modification time for the cache
+            mtime_ns = template_file.stat().st_mtime_ns
 
-        else:
+        except OSError:
             # Add the snippet name here as well to allow for more context
             # fix for https://gitlab.com/panw-gse/as/panhandler/-/issues/19
             logger.error(f'Snippet: {self.name} has file attribute that does not exist')
             logger.error(f'Snippet file path is: {template_path}')
             raise SkilletLoaderException(f'Snippet: {self.name} - Could not resolve template path!')
 
+        return _read_template(template_file, mtime_ns)
+
     def update_context(self, d: dict) -> dict:
         """
         Take the input dict d and update the skillet context. I.e. any variables passed in via environment variables
@@ -141,11 +236,9 @@ class Skillet(ABC):
         :param d: dictionary of key value pairs. Any keys that match 'variable' keys will be used to update the context
         :return: updated context stored on this skillet
         """
-        for var in self.variables:
-            if var['name'] in d:
-                self.context[var['name']] = d[var['name']]
-            else:
-                self.context[var['name']] = var['default']
+        # two bulk updates: all defaults first, then only the declared variables that were passed in
+        self.context.update(self._var_defaults)
+        self.context.update({name: d[name] for name in self._var_defaults.keys() & d.keys()})
 
         return self.context
 
@@ -157,8 +250,9 @@ class Skillet(ABC):
         :param initial_context: Initial Context from user input, environment vars, etc
         :return: updated context with initial context items plus any initialization items
         """
-        self.context.update(initial_context)
-        self.update_context(initial_context)
+        # start from the variable defaults and add everything from the initial context in a single pass. A new dict
+        # is used so nothing captured during a previous execution leaks into this one
+        self.context = {**self._var_defaults, **initial_context}
         return self.context
 
     @staticmethod
@@ -171,26 +265,23 @@ class Skillet(ABC):
         """
 
         for variable in vars_dict:
+            list_key = _LIST_FIELD.get(variable.get('type_hint', 'text'))
+            if list_key is None or list_key not in variable:
+                continue
+
             default = variable.get('default', '')
-            type_hint = variable.get('type_hint', 'text')
-            if type_hint == "dropdown" and "dd_list" in variable:
-                for item in variable.get('dd_list', []):
-                    if 'key' in item and 'value' in item:
-                        if default == item['key'] and default != item['value']:
-                            # user set the key as the default and not the value, just fix it for them here
-                            variable['default'] = item['value']
-            elif type_hint == "radio" and "rad_list" in variable:
-                rad_list = variable['rad_list']
-                for item in rad_list:
-                    if 'key' in item and 'value' in item:
-                        if default == item['key'] and default != item['value']:
-                            variable['default'] = item['value']
-            elif type_hint == "checkbox" and "cbx_list" in variable:
-                cbx_list = variable['cbx_list']
-                for item in cbx_list:
-                    if 'key' in item and 'value' in item:
-                        if default == item['key'] and default != item['value']:
-                            variable['default'] = item['value']
+            lookup = {item['key']: item['value'] for item in variable[list_key] if 'key' in item and 'value' in item}
+
+            try:
+                value = lookup[default]
+
+            except (KeyError, TypeError):
+                # no matching key, or the default is a list such as the selected items of a checkbox
+                continue
+
+            if default != value:
+                # user set the key as the default and not the value, just fix it for them here
+                variable['default'] = value
 
         return vars_dict
 
@@ -209,10 +300,18 @@ class Skillet(ABC):
         """
         try:
             self.success = True
+            # start each execution with fresh outputs so results from a previous run are not carried over
+            self.snippet_outputs = dict()
+            self.captured_outputs = dict()
+            debug = logger.isEnabledFor(logging.DEBUG)
             context = self.initialize_context(initial_context)
             logger.debug(f'Executing Async Skillet: {self.name}')
 
+            all_snippet_outputs = self.snippet_outputs
+            all_captured_outputs = self.captured_outputs
+
             for snippet in self.get_snippets():
+                snippet_name = snippet.name
                 try:
                     # render anything that looks like a jinja template in the snippet metadata
                     # mostly useful for xpaths in the panos case
@@ -221,20 +320,17 @@ class Skillet(ABC):
 
                     if snippet.should_execute(context):
                         (output, status) = snippet.execute(context)
-                        logger.debug(f'{snippet.name} - status: {status}')
 
                         if status != 'success':
                             self.success = False
 
-                        if output:
-                            logger.debug(f'{snippet.name} - output: {output}')
+                        if debug:
+                            logger.debug('%s - status: %s', snippet_name, status)
+                            if output:
+                                logger.debug('%s - output: %s', snippet_name, output)
 
                         full_output = ''
-                        while status == 'running':
-                            # logger.info('Snippet still running...')
-                            time.sleep(5)
-                            (partial_output, status) = snippet.get_output()
-
+                        for (partial_output, status) in self.__poll_snippet(snippet, status, None):
                             full_output += partial_output
 
                             yield partial_output
@@ -244,38 +340,31 @@ class Skillet(ABC):
                         snippet_outputs = snippet.get_default_output(output, status)
                         captured_outputs = snippet.capture_outputs(output, status)
 
-                        if captured_outputs:
-                            logger.debug(f'{snippet.name} - captured_outputs: {captured_outputs}')
+                        if debug and captured_outputs:
+                            logger.debug('%s - captured_outputs: %s', snippet_name, captured_outputs)
 
-                        if snippet.name in self.snippet_outputs:
-                            self.snippet_outputs[snippet.name].append(snippet_outputs)
-                            self.captured_outputs[snippet.name].append(captured_outputs)
+                        if snippet_name in all_snippet_outputs:
+                            all_snippet_outputs[snippet_name].append(snippet_outputs)
+                            all_captured_outputs[snippet_name].append(captured_outputs)
                         else:
                             # create a list of track progress here
-                            self.snippet_outputs[snippet.name] = [snippet_outputs]
-                            self.captured_outputs[snippet.name] = [captured_outputs]
+                            all_snippet_outputs[snippet_name] = [snippet_outputs]
+                            all_captured_outputs[snippet_name] = [captured_outputs]
 
                         context.update(snippet_outputs)
                         context.update(captured_outputs)
 
                 except SkilletLoaderException as sle:
-                    self.success = False
                     logger.error(f'Caught Exception during execution: {sle}')
-                    snippet_outputs = snippet.get_default_output(str(sle), 'error')
-                    logger.error(snippet_outputs)
-                    if snippet.name in self.snippet_outputs:
-                        self.snippet_outputs[snippet.name].append(snippet_outputs)
-                    else:
-                        self.snippet_outputs[snippet.name] = [snippet_outputs]
+                    logger.error(self.__record_snippet_error(snippet, sle))
 
                 except Exception as e:
-                    self.success = False
                     logger.error(f'Exception caught: {e}')
-                    snippet_outputs = snippet.get_default_output(str(e), 'error')
-                    if snippet.name in self.snippet_outputs:
-                        self.snippet_outputs[snippet.name].append(snippet_outputs)
-                    else:
-                        self.snippet_outputs[snippet.name] = [snippet_outputs]
+                    self.__record_snippet_error(snippet, e)
+
+                finally:
+                    # snippets are reused across executions, so always discard the rendered metadata
+                    snippet.reset_metadata()
 
         finally:
             self.cleanup()
@@ -286,7 +375,8 @@ class Skillet(ABC):
         """
         The heart of the Skillet class. This method executes the skillet by iterating over all the skillets returned
         from the 'get_skillets' method. Each one is checked if it should be executed if a 'when' conditional attribute
-        is found, and if so, is executed using the snippet execute method.
+        is found, and if so, is executed using the snippet execute method. Snippets are always executed one at a time
+        and in the order they are defined, as each may depend on the outputs or device changes of the ones before it.
 
         :param initial_context: context of key values pairs to use for the execution. By default this is all the
         variables defined in the skillet file with their default values. Updates from user input, the environment, etc
@@ -294,19 +384,26 @@ class Skillet(ABC):
         :return: a dict containing the updated context containing the output of each of the snippets
         """
         try:
-            # reset success on execution
+            # reset success and outputs on execution
             self.success = True
+            self.snippet_outputs = dict()
+            self.captured_outputs = dict()
+            debug = logger.isEnabledFor(logging.DEBUG)
+            # the context is kept as a plain dict, it is handed directly to jinja and to each snippet as is
             context = self.initialize_context(initial_context)
             logger.debug(f'Executing Skillet: {self.name}')
 
+            all_snippet_outputs = self.snippet_outputs
+            all_captured_outputs = self.captured_outputs
+
             for snippet in self.get_snippets():
+                snippet_name = snippet.name
                 try:
                     # allow subclasses to override this
                     snippet.update_context(context)
 
                     loop_vars = snippet.get_loop_parameter()
-                    index = 0
-                    for item in loop_vars:
+                    for index, item in enumerate(loop_vars):
                         context['loop'] = item
                         context['loop_index'] = index
 
@@ -317,66 +414,49 @@ class Skillet(ABC):
                             snippet.render_metadata(context)
 
                             (output, status) = snippet.execute(context)
-                            logger.debug(f'{snippet.name} - status: {status}')
 
                             if status != 'success':
                                 self.success = False
 
-                            if output:
-                                logger.debug(f'{snippet.name} - output: {output}')
-
-                            running_counter = 0
-
-                            while status == 'running':
-                                logger.info('Snippet still running...')
-                                time.sleep(5)
-                                (output, status) = snippet.get_output()
-                                running_counter += 1
+                            if debug:
+                                logger.debug('%s - status: %s', snippet_name, status)
+                                if output:
+                                    logger.debug('%s - output: %s', snippet_name, output)
 
-                                if running_counter > 60:
-                                    raise SkilletLoaderException('Snippet took too long to execute!')
+                            # wait for the snippet to complete, keeping only the latest output
+                            for (output, status) in self.__poll_snippet(snippet, status, _SNIPPET_TIMEOUT):
+                                pass
 
                             # capture all outputs
                             snippet_outputs = snippet.get_default_output(output, status)
                             captured_outputs = snippet.capture_outputs(output, status)
 
                             # only track snippet output across loops if we actually have loops configured
-                            if snippet.name in self.snippet_outputs and len(loop_vars) > 1:
-                                self.snippet_outputs[snippet.name].append(snippet_outputs)
+                            if snippet_name in all_snippet_outputs and len(loop_vars) > 1:
+                                all_snippet_outputs[snippet_name].append(snippet_outputs)
                             else:
                                 # create a list of track progress here
-                                self.snippet_outputs[snippet.name] = [snippet_outputs]
+                                all_snippet_outputs[snippet_name] = [snippet_outputs]
 
                             if captured_outputs:
-                                logger.debug(f'{snippet.name} - captured_outputs: {captured_outputs}')
+                                if debug:
+                                    logger.debug('%s - captured_outputs: %s', snippet_name, captured_outputs)
                                 # fixme - how does this interact with looping?
-                                self.captured_outputs.update(captured_outputs)
+                                all_captured_outputs.update(captured_outputs)
 
-                            # simple context addition here, does not count on iteration ?
-                            # context.update(snippet_outputs)
-                            context.update(captured_outputs)
+                                # simple context addition here, does not count on iteration ?
+                                # context.update(snippet_outputs)
+                                context.update(captured_outputs)
 
-                        index = index + 1
                         snippet.reset_metadata()
 
                 except SkilletLoaderException as sle:
-                    self.success = False
                     logger.error(f'Caught Exception during execution: {sle}')
-                    snippet_outputs = snippet.get_default_output(str(sle), 'error')
-                    logger.error(snippet_outputs)
-                    if snippet.name in self.snippet_outputs:
-                        self.snippet_outputs[snippet.name].append(snippet_outputs)
-                    else:
-                        self.snippet_outputs[snippet.name] = [snippet_outputs]
+                    logger.error(self.__record_snippet_error(snippet, sle))
 
                 except Exception as e:
-                    self.success = False
-                    logger.error(f'Exception caught in snippet: {snippet.name}: {e}')
-                    snippet_outputs = snippet.get_default_output(str(e), 'error')
-                    if snippet.name in self.snippet_outputs:
-                        self.snippet_outputs[snippet.name].append(snippet_outputs)
-                    else:
-                        self.snippet_outputs[snippet.name] = [snippet_outputs]
+                    logger.error(f'Exception caught in snippet: {snippet_name}: {e}')
+                    self.__record_snippet_error(snippet, e)
 
                 finally:
                     snippet.reset_metadata()
@@ -385,6 +465,44 @@ class Skillet(ABC):
 
         return self.get_results()
 
+    @staticmethod
+    def __poll_snippet(snippet: Snippet, status: str, timeout: Optional[float]) -> Generator:
+        """
+        Poll a snippet that is still running until it completes. This is shared by both execute and execute_async,
+        each of which decides what to do with the output as it arrives
+
+        :param snippet: snippet that was executed
+        :param status: status returned from the snippet execute method
+        :param timeout: seconds to wait for the snippet to complete, None to wait indefinitely
+        :raises: SkilletLoaderException if the snippet is still running after timeout seconds
+        :return: generator of (output, status) tuples as returned from the snippet get_output method
+        """
+        attempt = 0
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while status == 'running':
+            logger.info('Snippet still running...')
+            time.sleep(_poll_interval(attempt))
+            attempt += 1
+            (output, status) = snippet.get_output()
+
+            if status == 'running' and deadline is not None and time.monotonic() > deadline:
+                raise SkilletLoaderException('Snippet took too long to execute!')
+
+            yield output, status
+
+    def __record_snippet_error(self, snippet: Snippet, error: Exception) -> dict:
+        """
+        Mark this skillet as failed and record the error as the output of the snippet that raised it
+
+        :param snippet: snippet that raised the error
+        :param error: exception raised during the snippet execution
+        :return: the error output recorded for this snippet
+        """
+        self.success = False
+        snippet_outputs = snippet.get_default_output(str(error), 'error')
+        self.snippet_outputs.setdefault(snippet.name, []).append(snippet_outputs)
+        return snippet_outputs
+
     def get_results(self) -> dict:
         """
         Returns the results from the skillet execution. This must be called manually if using 'execute_async'. The
@@ -423,21 +541,21 @@ class Skillet(ABC):
 
         :return: dict with 'snippets' key
         """
-        results = dict()
-        results['snippets'] = dict()
+        snippet_outputs = self.snippet_outputs
+        snippet_results = dict()
 
-        for s in self.snippet_stack:
-            snippet_name = s.get('name', '')
+        # only the snippets that actually produced output, in the order they are defined
+        executed_snippet_names = [n for n in self._ordered_snippet_names if n in snippet_outputs]
 
-            if snippet_name in self.snippet_outputs:
-                loop_counter = 0
-                for loop_results in self.snippet_outputs[snippet_name]:
-                    if snippet_name not in results['snippets']:
-                        results['snippets'][snippet_name] = loop_results[snippet_name]
-                    else:
-                        results['snippets'][f'{snippet_name}_{loop_counter}'] = loop_results[snippet_name]
+        for snippet_name in executed_snippet_names:
+            loop_counter = 0
+            for loop_results in snippet_outputs[snippet_name]:
+                if snippet_name not in snippet_results:
+                    snippet_results[snippet_name] = loop_results[snippet_name]
+                else:
+                    snippet_results[f'{snippet_name}_{loop_counter}'] = loop_results[snippet_name]
 
-        return results
+        return {'snippets': snippet_results}
 
     def _parse_output_template(self, results: dict) -> dict:
         """
@@ -447,22 +565,28 @@ class Skillet(ABC):
         :param results: results of the skillet execution
         :return: results plus the output_template value if found
         """
+        if 'output_template' not in self.labels:
+            return results
+
         try:
-            if 'output_template' in self.labels:
-                output_template = self.load_template(self.labels['output_template'])
+            output_template = self.load_template(self.labels['output_template'])
+
+            # the template snippet is kept around for the next call unless the template itself has changed
+            template_snippet = self._output_template_snippet
+            if template_snippet is None or template_snippet.template_str != output_template:
                 template_snippet = SimpleTemplateSnippet(output_template)
-                # create context dict for template parsing
-                # add all outputs as 'top-level' attributes
-                context = dict()
-                context.update(results.get('outputs', {}))
-                context['snippet_outputs'] = self.snippet_outputs
-                context['captured_outputs'] = self.captured_outputs
-                context['context'] = self.context
-                # add other keys as top-level attributes as well...
-                for k, v in results.items():
-                    if k != 'outputs':
-                        context[k] = v
-                results['output_template'] = template_snippet.template(context)
+                self._output_template_snippet = template_snippet
+
+            # create context dict for template parsing
+            # add all outputs as 'top-level' attributes, then other keys as top-level attributes as well...
+            context = {
+                **results.get('outputs', {}),
+                'snippet_outputs': self.snippet_outputs,
+                'captured_outputs': self.captured_outputs,
+                'context': self.context,
+                **{k: v for k, v in results.items() if k != 'outputs'}
+            }
+            results['output_template'] = template_snippet.template(context)
 
         except (SkilletLoaderException, TemplateError) as e:
             print(e)
@@ -470,7 +594,7 @@ class Skillet(ABC):
 
         return results
 
-    def __validate_snippet_metadata(self) -> None:
+    def __validate_snippet_metadata(self) -> tuple:
         """
         Perform snippet metadata validation before we attempt to instantiate the snippet
 
@@ -478,18 +602,22 @@ class Skillet(ABC):
         Will also set all optional metadata attributes with their default values
 
         :raises: SkilletLoaderException if a required field is not present
-        :return: None
+        :return: tuple of the snippet names in the order they are defined
         """
+        names = list()
         for s in self.snippet_stack:
             name = s.get('name', '')
-            for r in self.snippet_required_metadata:
-                if r not in s:
-                    raise SkilletLoaderException(f'Invalid snippet metadata configuration: attribute: {r} '
-                                                 f'is required for snippet: {name}')
+            names.append(name)
+
+            missing = self.snippet_required_metadata - s.keys()
+            if missing:
+                raise SkilletLoaderException(f'Invalid snippet metadata configuration: attribute: '
+                                             f'{", ".join(sorted(missing))} is required for snippet: {name}')
 
             for k, v in self.snippet_optional_metadata.items():
-                if k not in s:
-                    s[k] = v
+                s.setdefault(k, v)
+
+        return tuple(names)
 
     def get_declared_variables(self) -> List[str]:
         """
@@ -498,14 +626,16 @@ class Skillet(ABC):
         :return: list of variable names
         """
 
-        # get list of output_vars from all snippets using double list comprehension
-        output_vars = [o for s in self.get_snippets() for o in s.get_output_variables()]
+        # only load the snippets once, some skillet types will re-instantiate them on every call
+        snippets = self.get_snippets()
 
-        # get list of all variables defined in all snippets that are NOT in the output_vars
-        dv = [x for s in self.get_snippets() for x in s.get_snippet_variables() if x not in output_vars]
+        # get set of output_vars from all snippets using double comprehension
+        output_vars = {o for s in snippets for o in s.get_output_variables()}
 
-        # convert to set and back to list to remove dups
-        return list(set(dv))
+        # get set of all variables defined in all snippets that are NOT in the output_vars
+        dv = {x for s in snippets for x in s.get_snippet_variables() if x not in output_vars}
+
+        return list(dv)
 
     @staticmethod
     def __normalize_skillet_dict(skillet: dict) -> dict:
@@ -516,30 +646,15 @@ class Skillet(ABC):
         if type(skillet) is not dict:
             skillet = dict()
 
-        if 'name' not in skillet:
-            skillet['name'] = 'Unknown Skillet'
-
-        if 'label' not in skillet:
-            skillet['label'] = 'Unknown Skillet'
+        skillet.setdefault('name', 'Unknown Skillet')
+        skillet.setdefault('label', 'Unknown Skillet')
+        skillet.setdefault('type', 'template')
+        skillet.setdefault('description', 'Unknown Skillet')
+        skillet.setdefault('variables', list())
+        skillet.setdefault('snippets', list())
 
-        if 'type' not in skillet:
-            skillet['type'] = 'template'
-
-        if 'description' not in skillet:
-            skillet['description'] = 'Unknown Skillet'
-
-        if 'variables' not in skillet:
-            skillet['variables'] = list()
-
-        if 'snippets' not in skillet:
-            skillet['snippets'] = list()
-
-        if 'labels' not in skillet:
-            skillet['labels'] = dict()
-
-        if 'collection' not in skillet['labels']:
-            skillet['labels']['collection'] = list()
-            skillet['labels']['collection'].append('Kitchen Sink')
+        labels = skillet.setdefault('labels', dict())
+        labels.setdefault('collection', ['Kitchen Sink'])
 
         return skillet
 
@@ -551,15 +666,17 @@ class Skillet(ABC):
         """
         try:
 
-            # remove non-essential non-portable items from the dict before dumping
-            safe_skillet_dict = copy.deepcopy(self.skillet_dict)
+            # remove non-essential non-portable items from the dict before dumping. Only the top level and each
+            # snippet definition are modified here, so shallow copies of those are enough
+            safe_skillet_dict = copy.copy(self.skillet_dict)
+            safe_skillet_dict['snippets'] = [copy.copy(snippet) for snippet in safe_skillet_dict.get('snippets', [])]
 
             safe_skillet_dict.pop('snippet_path', None)
             safe_skillet_dict.pop('skillet_path', None)
             safe_skillet_dict.pop('skillet_filename', None)
             safe_skillet_dict.pop('app_data', None)
 
-            for snippet in safe_skillet_dict.get('snippets'):
+            for snippet in safe_skillet_dict['snippets']:
                 snippet.pop('skillet_path', None)
                 for k, v in self.snippet_optional_metadata.items():
                     if snippet[k] == v:
@@ -568,25 +685,6 @@ class Skillet(ABC):
             if not safe_skillet_dict.get("depends", []):
                 safe_skillet_dict.pop('depends', None)
 
-            # Custom YAML dumper to inject appropriate white-space
-            class SkilletYamlDumper(yaml.SafeDumper):
-                def write_line_break(self, data=None):
-                    super().write_line_break(data)
-                    if len(self.indents) < 3:
-                        super().write_line_break()
-
-                # we should not use anchors in YAML at all for this
-                def ignore_aliases(self, data):
-                    return True
-
-            # Add a str presenter for multi-line text
-            def str_presenter(dumper, data):
-                if len(data.splitlines()) > 1:
-                    return dumper.represent_scalar("tag:yaml.org,2002:str", data, style="|")
-                return dumper.represent_scalar("tag:yaml.org,2002:str", data)
-
-            SkilletYamlDumper.add_representer(str, str_presenter)
-
             return yaml.dump(safe_skillet_dict, indent=4, Dumper=SkilletYamlDumper)
 
         except (ScannerError, ValueError) as err:
@@ -49,11 +49,16 @@ class WorkflowSkillet(Skillet):
         if not self.initialized:
             return snippet_list
 
+        # once initialized, the workflow snippets only need to be built once
+        if getattr(self, 'snippets', None):
+            return self.snippets
+
         for snippet_def in self.snippet_stack:
             skillet = self.skillet_loader.get_skillet_with_name(snippet_def['name'])
             snippet = WorkflowSnippet(snippet_def, skillet, self.skillet_loader)
             snippet_list.append(snippet)
 
+        self.snippets = snippet_list
         return snippet_list
 
     def get_results(self) -> dict:
@@ -14,6 +14,7 @@
 
 # Authors: Nathan Embery
 import copy
+import functools
 import logging
 import os
 import sys
@@ -37,6 +38,25 @@ if not len(logger.handlers):
     handler.setLevel(logging.DEBUG)
     logger.addHandler(handler)
 
+# prefer the libyaml based loader when available, it is considerably faster than the pure python SafeLoader
+_YAML_LOADER = getattr(oyaml, "CSafeLoader", oyaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=256)
+def _load_skillet_file(path_str: str, mtime_ns: int, size: int) -> dict:
+    """
+    Load and parse a skillet metadata file. The parsed document is cached by path, modification time, and size so
+    loading the same skillets repeatedly does not parse them again, while changes to the file are still picked up.
+    Callers must not modify the returned document
+
+    :param path_str: absolute path of the skillet metadata file
+    :param mtime_ns: modification time of the file, only used as part of the cache key
+    :param size: size of the file, only used as part of the cache key
+    :return: parsed skillet metadata
+    """
+    with open(path_str, mode="r", encoding="utf-8") as sc:
+        return oyaml.load(sc, Loader=_YAML_LOADER)
+
 
 class SkilletLoader:
     """
@@ -220,13 +240,16 @@ class SkilletLoader:
 
         try:
 
-            with meta_cnc_file.open(mode="r", encoding="utf-8") as sc:
-                raw_service_config = oyaml.safe_load(sc.read())
-                skillet = self.normalize_skillet_dict(raw_service_config)
-                skillet["snippet_path"] = snippet_path
-                skillet["skillet_path"] = snippet_path
-                skillet["skillet_filename"] = skillet_file
-                return skillet
+            stat = meta_cnc_file.stat()
+            # the cached document is shared, so always work on a copy of it
+            raw_service_config = copy.deepcopy(
+                _load_skillet_file(str(meta_cnc_file.absolute()), stat.st_mtime_ns, stat.st_size)
+            )
+            skillet = self.normalize_skillet_dict(raw_service_config)
+            skillet["snippet_path"] = snippet_path
+            skillet["skillet_path"] = snippet_path
+            skillet["skillet_filename"] = skillet_file
+            return skillet
 
         except IOError:
             logger.error("Could not open metadata file in dir %s" % meta_cnc_file.parent)
@@ -32,6 +32,7 @@ import jmespath
 import xmltodict
 from jinja2 import BaseLoader
 from jinja2 import Environment
+from jinja2 import Template
 from jinja2 import TemplateError
 from jinja2 import meta
 from jinja2.exceptions import TemplateAssertionError
@@ -140,7 +141,7 @@ class Snippet(ABC):
         :return: boolean
         """
 
-        logger.debug(f"Checking snippet: {self.name}")
+        logger.debug("Checking snippet: %s", self.name)
 
         # hook for pre-conditional checks
         context = self.update_context(context)
@@ -152,11 +153,11 @@ class Snippet(ABC):
 
         if "when" not in self.metadata:
             # always execute when no when conditional is present
-            logger.debug(f"No conditional present, proceeding with skillet: {self.name}")
+            logger.debug("No conditional present, proceeding with skillet: %s", self.name)
             return True
 
         results = self.execute_conditional(self.metadata["when"], context)
-        logger.debug(f"  Conditional Evaluation results: {results} ")
+        logger.debug("  Conditional Evaluation results: %s ", results)
         return results
 
     def is_filtered(self, context) -> bool:
@@ -323,7 +324,7 @@ class Snippet(ABC):
         """
         try:
             test_str = "{{%- if {0} -%}} True {{%- else -%}} False {{%- endif -%}}".format(test)
-            test_template = self._env.from_string(test_str)
+            test_template = self._get_template(test_str)
             results = test_template.render(context)
             if str(results).strip() == "True":
                 return True
@@ -509,9 +510,24 @@ class Snippet(ABC):
         if not isinstance(template_str, str):
             return template_str
 
-        t = self._env.from_string(template_str)
+        t = self._get_template(template_str)
         return t.render(context)
 
+    def _get_template(self, template_str: str) -> Template:
+        """
+        Return the compiled jinja2 template for template_str. Metadata, conditionals, and outputs are rendered again
+        on every execution and loop iteration, so compiled templates are kept for the lifetime of this snippet
+
+        :param template_str: jinja2 template to compile
+        :return: compiled jinja2 Template
+        """
+        template = self._template_cache.get(template_str)
+        if template is None:
+            template = self._env.from_string(template_str)
+            self._template_cache[template_str] = template
+
+        return template
+
     def get_variables_from_template(self, template_str: str) -> list:
         """
         Returns a list of jinja2 variable found in the template
@@ -995,6 +1011,7 @@ class Snippet(ABC):
         :return: Jinja2 environment object
         """
         self._env = Environment(loader=BaseLoader, extensions=[AnsibleCoreFiltersExtension, jinja_ext_do])
+        self._template_cache = dict()
         self._env.filters["md5_hash"] = self._md5_hash
         self._env.filters["slugify"] = self._slugify
         self._env.filters["s"] = self._slugify
@@ -1163,7 +1180,7 @@ class Snippet(ABC):
                 # by default we will attempt to return the text of the found element
                 return_type = "text"
                 entries = xml_doc.xpath(capture_pattern)
-                logger.debug(f"found entries: {entries}")
+                logger.debug("found entries: %s", entries)
                 if len(entries) == 0:
                     captured_output[var_name] = ""
                 elif len(entries) == 1:
@@ -0,0 +1,180 @@
+# These tests exercise Panoply methods against a mocked xapi, no device is required
+
+import asyncio
+from unittest import mock
+from xml.etree import ElementTree
+
+from skilletlib.panoply import Panoply
+
+connected_devices_xml = '''
+<devices>
+    <entry name="0001">
+        <hostname>fw-east</hostname>
+        <model>PA-VM</model>
+        <sw-version>10.0.1</sw-version>
+    </entry>
+    <entry name="0002">
+        <hostname>fw-west</hostname>
+        <model>PA-VM</model>
+        <sw-version>9.1.4</sw-version>
+    </entry>
+</devices>
+'''
+
+content_updates_xml = '''
+<response status="success">
+    <result>
+        <content-updates>
+            <entry>
+                <version>8.9-6543</version>
+                <current>{current_89}</current>
+            </entry>
+            <entry>
+                <version>8.10-1234</version>
+                <current>{current_810}</current>
+            </entry>
+            <entry>
+                <version>8.9-7000</version>
+                <current>no</current>
+            </entry>
+        </content-updates>
+    </result>
+</response>
+'''
+
+system_info_xml = '''
+<system>
+    <hostname>fw-east</hostname>
+    <model>PA-VM</model>
+    <sw-version>10.0.1</sw-version>
+</system>
+'''
+
+system_config_xml = '''
+<system>
+    <timezone>UTC</timezone>
+</system>
+'''
+
+
+def get_offline_panoply() -> Panoply:
+    """
+    Build a Panoply instance that never attempts to connect, with a mocked xapi in place
+
+    :return: Panoply instance
+    """
+    device = Panoply()
+    device.xapi = mock.MagicMock()
+    device.connected = True
+    return device
+
+
+def test_filter_connected_devices_matches_all_terms():
+    """
+    Test to verify a device is filtered out when only the first of several filter terms does not match
+
+    :return: None
+    """
+    device = get_offline_panoply()
+    device.facts = {'model': 'Panorama'}
+
+    with mock.patch.object(device, 'execute_cli', return_value=connected_devices_xml):
+        # the first term only matches fw-west, the second matches both devices
+        filtered = device.filter_connected_devices({'hostname': 'fw-west', 'model': 'PA-VM'})
+        assert [d['hostname'] for d in filtered] == ['fw-west']
+
+        # the first term matches no device at all, even though the last term matches both
+        filtered = device.filter_connected_devices({'sw-version': '8', 'model': 'PA-VM'})
+        assert filtered == []
+
+        # no terms returns every connected device
+        filtered = device.filter_connected_devices()
+        assert len(filtered) == 2
+
+
+def test_connect_reuses_recent_facts():
+    """
+    Test to verify a second connect within the facts TTL does not query the device for facts again, unless a refresh
+    is requested
+
+    :return: None
+    """
+    device = get_offline_panoply()
+    device.xapi.status = 'success'
+    device.xapi.xml_result.side_effect = [system_info_xml, system_config_xml, system_info_xml, system_config_xml]
+
+    device.connect()
+    device.connect()
+
+    assert device.facts['model'] == 'PA-VM'
+    assert device.facts['timezone'] == 'UTC'
+    assert device.xapi.keygen.call_count == 2
+    assert device.xapi.op.call_count == 1
+    assert device.xapi.show.call_count == 1
+
+    device.get_facts(refresh=True)
+    assert device.xapi.op.call_count == 2
+    assert device.xapi.show.call_count == 2
+
+
+def test_check_content_updates_orders_versions_numerically():
+    """
+    Test to verify check_content_updates compares versions as tuples of ints, so 8.10 is newer than 8.9, and
+    returns None when the newest version is already installed or there is nothing to check
+
+    :return: None
+    """
+    device = get_offline_panoply()
+
+    device.xapi.element_root = ElementTree.fromstring(content_updates_xml.format(current_89='yes', current_810='no'))
+    assert device.check_content_updates('content') == '8.10-1234'
+
+    device.xapi.element_root = ElementTree.fromstring(content_updates_xml.format(current_89='no', current_810='yes'))
+    assert device.check_content_updates('content') is None
+
+    device.xapi.element_root = ElementTree.fromstring('<response status="success"><result/></response>')
+    assert device.check_content_updates('content') is None
+
+
+def test_wait_for_devices_ready_reports_each_device():
+    """
+    Test to verify wait_for_devices_ready returns True for a device that becomes ready and False for a device that
+    times out, in the same order as the given devices
+
+    :return: None
+    """
+    ready_device = get_offline_panoply()
+    offline_device = get_offline_panoply()
+
+    # use a dedicated event loop, asyncio.run is not available on python 3.6
+    loop = asyncio.new_event_loop()
+
+    try:
+        with mock.patch.object(ready_device, '_Panoply__check_device_ready', return_value=True), \
+                mock.patch.object(offline_device, '_Panoply__check_device_ready', return_value=False) as offline_check:
+            results = loop.run_until_complete(
+                Panoply.wait_for_devices_ready([ready_device, offline_device], interval=0.01, timeout=0.05)
+            )
+
+    finally:
+        loop.close()
+
+    assert results == [True, False]
+    assert offline_check.call_count > 1
+
+
+def test_wait_for_many_reports_each_device():
+    """
+    Test to verify wait_for_many waits on all devices concurrently and reports each device in order
+
+    :return: None
+    """
+    ready_device = get_offline_panoply()
+    offline_device = get_offline_panoply()
+
+    with mock.patch.object(ready_device, '_Panoply__check_device_ready', return_value=True), \
+            mock.patch.object(offline_device, '_Panoply__check_device_ready', return_value=False):
+        results = Panoply.wait_for_many([offline_device, ready_device], interval=0.01, timeout=0.05)
+
+    assert results == [False, True]
+    assert Panoply.wait_for_many([]) == []